@@ -74,4 +74,80 @@ ALTER TABLE popcorn.movies ADD COLUMN content_rating STRING;
 
 -- COMMAND ----------
 
+-- DBTITLE 1,ADDING INCREMENTAL ETL COLUMNS
+-- When each enrichment class was last fetched, and a hash of the content
+-- columns so unchanged movies can be skipped on MERGE
+ALTER TABLE popcorn.movies ADD COLUMNS (
+    details_updated TIMESTAMP,  -- content_rating + streaming_platforms (TMDB details)
+    ratings_updated TIMESTAMP,  -- OMDb ratings
+    content_hash STRING
+);
+
+-- COMMAND ----------
+
+-- DBTITLE 1,ENABLING CHANGE DATA FEED
+-- movie_data_dynamo_sync reads row-level changes from the feed to push only
+-- what changed since its last run
+ALTER TABLE popcorn.movies SET TBLPROPERTIES (delta.enableChangeDataFeed = true);
+
+-- COMMAND ----------
+
+-- DBTITLE 1,Creating Sync State
+-- Last popcorn.movies version each downstream sync has pushed
+CREATE TABLE IF NOT EXISTS popcorn.sync_state (
+    target STRING,
+    last_version BIGINT,
+    synced_at TIMESTAMP,
+    CONSTRAINT pk_sync_target PRIMARY KEY (target)
+)
+USING DELTA;
+
+-- COMMAND ----------
+
+-- DBTITLE 1,Creating DynamoDB Manifest
+-- Content hash of every movie item last written to each DynamoDB sync target
+CREATE TABLE IF NOT EXISTS popcorn.dynamo_manifest (
+    target STRING,
+    movie_id STRING,
+    content_hash STRING,
+    synced_at TIMESTAMP
+)
+USING DELTA;
+
+-- COMMAND ----------
+
+-- DBTITLE 1,Creating Movies Staging
+-- Per-run checkpoints of the movie ETL; rows are deleted once a run is merged
+CREATE TABLE IF NOT EXISTS popcorn.movies_staging (
+    movie_id STRING,
+    title STRING,
+    year INT,
+    genres ARRAY<STRING>,
+    image_url STRING,
+    summary STRING,
+    content_rating STRING,
+    ratings ARRAY<STRUCT<
+        source: STRING,
+        score: DOUBLE,
+        max_score: DOUBLE
+    >>,
+    streaming_platforms ARRAY<STRUCT<
+        platform: STRING,
+        url: STRING
+    >>,
+    last_updated TIMESTAMP,
+    details_updated TIMESTAMP,
+    ratings_updated TIMESTAMP,
+    content_hash STRING,
+    write_action STRING,  -- 'changed', 'refreshed' or 'untouched'
+    run_id STRING,
+    batch_id INT,
+    run_kind STRING,      -- 'popular' or 'bootstrap'; runs only resume their own kind
+    source STRING,        -- export a bootstrap's batch IDs refer to (NULL for popular runs)
+    checkpointed_at TIMESTAMP
+)
+USING DELTA;
+
+-- COMMAND ----------
+
 describe popcorn.movies
\ No newline at end of file
@@ -34,8 +34,33 @@ import boto3
 from decimal import Decimal
 import json
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from collections import Counter, deque
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from botocore.exceptions import ClientError
+import hashlib
+import os
+import random
+import sys
 import time
+from pyspark.sql import Window
+import pyspark.sql.functions as F
+
+def notebook_dir() -> str:
+    """Directory holding this notebook, whatever the current working directory is."""
+    try:
+        return os.path.dirname(os.path.abspath(__file__))
+    except NameError:
+        # Notebooks have no __file__; the repo is mounted under /Workspace
+        context = dbutils.notebook.entry_point.getDbutils().notebook().getContext()
+        return os.path.dirname("/Workspace" + context.notebookPath().get())
+
+# The compact catalog encoding is shared with the selection Lambdas
+LAMBDA_FUNCTIONS_DIR = os.path.normpath(os.path.join(notebook_dir(), "..", "..", "infrastructure", "lambda", "functions"))
+if LAMBDA_FUNCTIONS_DIR not in sys.path:
+    sys.path.append(LAMBDA_FUNCTIONS_DIR)
+from common import catalog_codec
 
 # AWS Configuration
 def get_aws_client():
@@ -53,8 +78,16 @@ def get_aws_client():
 
 # COMMAND ----------
 
-def convert_to_dynamo_format(movie: Dict[str, Any]) -> Dict[str, Any]:
-    """Convert Delta Lake movie record to DynamoDB format."""
+def convert_to_dynamo_format(movie: Dict[str, Any], warnings: Optional[Counter] = None,
+                             compact: bool = False) -> Dict[str, Any]:
+    """
+    Convert Delta Lake movie record to DynamoDB format.
+    
+    Data problems are tallied in `warnings` (if given) instead of printed
+    per movie, so large syncs report them as one summary. With compact=True
+    the item also gets the encoded selection projection read through
+    SelectionIndex (see common/catalog_codec.py).
+    """
     
     # Helper function to handle Decimal conversion
     def convert_number(n):
@@ -85,15 +118,13 @@ def convert_to_dynamo_format(movie: Dict[str, Any]) -> Dict[str, Any]:
             platform_item['M']['url'] = {'S': platform[1]}
         platforms.append(platform_item)
     
-    # Debug logging
-    print(f"Converting movie: {movie['title']}")
-    if movie.get('year') is None:
-        print(f"WARNING: No year for movie {movie['title']}")
-    for rating in movie.get('ratings', []):
-        if None in (rating[1], rating[2]):
-            print(f"WARNING: None values in ratings for {movie['title']}: {rating}")
+    if warnings is not None:
+        if movie.get('year') is None:
+            warnings['no_year'] += 1
+        if any(None in (rating[1], rating[2]) for rating in movie.get('ratings', [])):
+            warnings['null_rating_values'] += 1
 
-    return {
+    item = {
         'movie_id': {'S': str(movie['movie_id'])},
         'title': {'S': movie['title']},
         'year': {'N': str(movie['year'])} if movie.get('year') is not None else {'NULL': True},
@@ -103,89 +134,417 @@ def convert_to_dynamo_format(movie: Dict[str, Any]) -> Dict[str, Any]:
         'content_rating': {'S': movie['content_rating']} if movie.get('content_rating') else {'NULL': True},
         'ratings': {'L': ratings},
         'streaming_platforms': {'L': platforms},
-        'last_updated': {'S': datetime.now().isoformat()}
+        # The ETL only moves last_updated when the content changes
+        'last_updated': {'S': (movie.get('last_updated') or datetime.now()).isoformat()}
     }
+    if compact:
+        item.update(selection_attributes(movie))
+    item['content_hash'] = {'S': item_content_hash(item)}
+    return item
+
+def selection_attributes(movie: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact selection projection of a movie as DynamoDB attribute values."""
+    encoded = catalog_codec.encode_selection(
+        movie['movie_id'],
+        movie.get('genres') or [],
+        [platform[0] for platform in movie.get('streaming_platforms') or []],
+        [tuple(rating) for rating in movie.get('ratings') or []]
+    )
+    attributes = {}
+    for name, value in encoded.items():
+        if isinstance(value, int):
+            attributes[name] = {'N': str(value)}
+        elif name == catalog_codec.RATINGS_ATTR:
+            attributes[name] = {'L': [{'N': str(packed)} for packed in value]}
+        else:
+            attributes[name] = {'L': [{'S': extra} for extra in value]}
+    return attributes
+
+# Bookkeeping attributes left out of the content hash
+UNHASHED_ATTRIBUTES = ('last_updated', 'content_hash')
+
+def item_content_hash(item: Dict[str, Any]) -> str:
+    """Stable hash of an item's business attributes, as written to DynamoDB."""
+    content = {name: value for name, value in item.items() if name not in UNHASHED_ATTRIBUTES}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
 
 # COMMAND ----------
 
-def batch_write_to_dynamo(dynamo_client, items: List[Dict[str, Any]], table_name: str):
-    """Write items to DynamoDB in batches."""
-    BATCH_SIZE = 25  # DynamoDB maximum batch size
+# Parallel batch writer tuning
+BATCH_SIZE = 25  # DynamoDB maximum batch size
+MAX_WRITE_WORKERS = 16  # upper bound on concurrent BatchWriteItem calls
+MAX_ITEM_ATTEMPTS = 6  # attempts per item before it is reported as failed
+RETRY_BACKOFF_BASE = 0.1  # seconds; doubled per attempt, with jitter
+RETRY_BACKOFF_CAP = 5.0  # seconds
+THROTTLE_ERRORS = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+
+def batch_write_to_dynamo(dynamo_client, items: Iterable[Dict[str, Any]], table_name: str,
+                          max_workers: int = MAX_WRITE_WORKERS, key_attribute: str = 'movie_id',
+                          delete_keys: Iterable[Dict[str, Any]] = None) -> Dict[str, int]:
+    """
+    Write items (and delete keys) to DynamoDB with concurrent BatchWriteItem calls.
     
-    for i in range(0, len(items), BATCH_SIZE):
-        batch = items[i:i + BATCH_SIZE]
-        request_items = {
-            table_name: [{'PutRequest': {'Item': item}} for item in batch]
-        }
-        
-        retry_count = 0
-        max_retries = 3
-        while retry_count < max_retries:
-            try:
-                response = dynamo_client.batch_write_item(RequestItems=request_items)
+    Both may be lazy iterators: requests are pulled only as batches are
+    sent, so at most a few batches per worker are held in memory. Unprocessed items are re-queued into later batches after a short
+    per-item backoff instead of blocking the writer. Concurrency adapts
+    to throttling: it is halved whenever a batch comes back throttled or
+    partially processed and grows by one after each clean batch.
+    
+    Returns:
+        Counts of submitted, written and failed requests, retried requests
+        and throttled batches
+    """
+    pending = chain(
+        ({'PutRequest': {'Item': item}} for item in items),
+        ({'DeleteRequest': {'Key': key}} for key in delete_keys or [])
+    )
+    exhausted = False
+    ready = deque()  # (request, attempt)
+    delayed = []  # (not_before, request, attempt)
+    counts = {"submitted": 0, "written": 0, "failed": 0, "retried": 0, "throttled_batches": 0}
+    concurrency = max(1, max_workers // 2)
+    in_flight = {}
+    last_report = time.time()
+    
+    def request_key(request):
+        # UnprocessedItems come back as new dicts, so requests are matched on the key
+        record = request['PutRequest']['Item'] if 'PutRequest' in request else request['DeleteRequest']['Key']
+        return json.dumps(record[key_attribute])
+    
+    def write_batch(batch):
+        request_items = {table_name: [request for request, _ in batch]}
+        response = dynamo_client.batch_write_item(RequestItems=request_items)
+        return response.get('UnprocessedItems', {}).get(table_name, [])
+    
+    def requeue(request, attempt):
+        if attempt >= MAX_ITEM_ATTEMPTS:
+            counts["failed"] += 1
+            return
+        counts["retried"] += 1
+        delay = random.uniform(0, min(RETRY_BACKOFF_CAP, RETRY_BACKOFF_BASE * (2 ** attempt)))
+        delayed.append((time.time() + delay, request, attempt + 1))
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while ready or delayed or in_flight or not exhausted:
+            # Pull just enough new requests to keep every worker busy
+            while not exhausted and len(ready) < BATCH_SIZE * max_workers:
+                request = next(pending, None)
+                if request is None:
+                    exhausted = True
+                else:
+                    ready.append((request, 1))
+                    counts["submitted"] += 1
+            
+            # Promote re-queued items whose backoff has elapsed
+            now = time.time()
+            if delayed:
+                due = [entry for entry in delayed if entry[0] <= now]
+                delayed[:] = [entry for entry in delayed if entry[0] > now]
+                ready.extend((request, attempt) for _, request, attempt in due)
+            
+            while ready and len(in_flight) < concurrency:
+                batch = [ready.popleft() for _ in range(min(BATCH_SIZE, len(ready)))]
+                in_flight[executor.submit(write_batch, batch)] = batch
+            
+            if not in_flight:
+                if not delayed:
+                    continue
+                # Only backed-off items remain; wait for the earliest one
+                time.sleep(max(0.0, min(entry[0] for entry in delayed) - time.time()))
+                continue
+            
+            done, _ = wait(list(in_flight), timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    unprocessed = future.result()
+                    throttled = bool(unprocessed)
+                except ClientError as e:
+                    if e.response['Error']['Code'] not in THROTTLE_ERRORS:
+                        print(f"Error writing batch of {len(batch)} items: {e}")
+                    throttled = e.response['Error']['Code'] in THROTTLE_ERRORS
+                    unprocessed = [request for request, _ in batch]
                 
-                # Handle unprocessed items
-                unprocessed = response.get('UnprocessedItems', {})
-                if not unprocessed:
-                    break
-                    
-                # If there are unprocessed items, retry them
-                request_items = unprocessed
-                retry_count += 1
-                time.sleep(2 ** retry_count)  # Exponential backoff
+                attempts = {request_key(request): attempt for request, attempt in batch}
+                counts["written"] += len(batch) - len(unprocessed)
+                for request in unprocessed:
+                    requeue(request, attempts[request_key(request)])
                 
-            except Exception as e:
-                print(f"Error in batch {i//BATCH_SIZE}: {str(e)}")
-                retry_count += 1
-                if retry_count == max_retries:
-                    raise
-                time.sleep(2 ** retry_count)
-        
-        # Log progress
-        print(f"Processed {min(i + BATCH_SIZE, len(items))} of {len(items)} items")
+                if throttled:
+                    counts["throttled_batches"] += 1
+                    concurrency = max(1, concurrency // 2)
+                else:
+                    concurrency = min(max_workers, concurrency + 1)
+            
+            if time.time() - last_report >= 10:
+                last_report = time.time()
+                print(f"Written {counts['written']} of {counts['submitted']} requests so far "
+                      f"(concurrency {concurrency}, {len(ready) + len(delayed)} queued)")
+    
+    print(f"Processed {counts['submitted']} requests: {counts}")
+    return counts
 
 # COMMAND ----------
 
-def sync_movies_to_dynamo():
-    """Main function to sync Delta table movies to DynamoDB."""
+MOVIES_TABLE = "popcorn.movies"
+DYNAMO_TABLE = "popcorn-movies"  # used until a versioned catalog is published
+
+# Catalog rebuilds are published blue/green: each one is written to a fresh
+# popcorn-movies-v<version> table and the Lambdas follow the pointer record
+# in CATALOG_TABLE (see common/catalog_util.py)
+CATALOG_TABLE = "popcorn-catalog"
+CATALOG_POINTER_KEY = "movies"
+VERSIONED_TABLE_PREFIX = "popcorn-movies-v"
+
+# Encoding of newly published catalog versions; each version keeps the
+# encoding it was published with (recorded on the pointer)
+CATALOG_ENCODING = catalog_codec.ENCODING_COMPACT
+
+# Last popcorn.movies version pushed to DynamoDB, per sync target
+SYNC_STATE_TABLE = "popcorn.sync_state"
+
+def sync_target(table_name: str) -> str:
+    """Sync state and manifest key for a DynamoDB table."""
+    return f"dynamo:{table_name}"
+
+def get_catalog_pointer(dynamo_client) -> Dict[str, Any]:
+    response = dynamo_client.get_item(
+        TableName=CATALOG_TABLE,
+        Key={'config_key': {'S': CATALOG_POINTER_KEY}},
+        ConsistentRead=True
+    )
+    return response.get('Item', {})
+
+def get_active_catalog(dynamo_client) -> Tuple[str, str]:
+    """The movies table the Lambdas currently read, and its encoding."""
+    pointer = get_catalog_pointer(dynamo_client)
+    if 'active_table' not in pointer:
+        return DYNAMO_TABLE, catalog_codec.ENCODING_FULL
+    encoding = pointer.get('encoding', {}).get('S', catalog_codec.ENCODING_FULL)
+    return pointer['active_table']['S'], encoding
+
+def get_active_table(dynamo_client) -> str:
+    return get_active_catalog(dynamo_client)[0]
+
+# Movies missing any of these are never synced (and are deleted from
+# DynamoDB when an update makes them ineligible)
+ELIGIBLE_FILTER = """
+    year IS NOT NULL 
+    AND size(streaming_platforms) > 0
+    AND title != ''
+    AND size(genres) > 0
+    AND image_url IS NOT NULL
+    AND summary != ''
+    AND size(ratings) > 0
+    AND content_rating IS NOT NULL
+"""
+
+# Content hash of every item last written to each sync target, so unchanged
+# movies can be skipped without reading them back from DynamoDB
+MANIFEST_TABLE = "popcorn.dynamo_manifest"
+
+def manifest_df(target: str):
+    """(movie_id, synced_hash) for a target, or None if nothing has been recorded."""
+    if not spark.catalog.tableExists(MANIFEST_TABLE):
+        return None
+    return (
+        spark.table(MANIFEST_TABLE)
+        .filter(F.col("target") == target)
+        .select("movie_id", F.col("content_hash").alias("synced_hash"))
+    )
+
+def update_manifest(target: str, written: List[tuple], deleted_ids: List[str]):
+    """Record the hashes just written and forget deleted movies."""
+    if written:
+        spark.createDataFrame(written, "movie_id STRING, content_hash STRING") \
+            .withColumn("target", F.lit(target)) \
+            .withColumn("synced_at", F.current_timestamp()) \
+            .createOrReplaceTempView("manifest_updates")
+        spark.sql(f"""
+            MERGE INTO {MANIFEST_TABLE} target
+            USING manifest_updates source
+            ON target.target = source.target AND target.movie_id = source.movie_id
+            WHEN MATCHED THEN
+                UPDATE SET *
+            WHEN NOT MATCHED THEN
+                INSERT *
+        """)
+    if deleted_ids:
+        spark.createDataFrame([(movie_id,) for movie_id in deleted_ids], "movie_id STRING") \
+            .createOrReplaceTempView("manifest_deletes")
+        spark.sql(f"""
+            MERGE INTO {MANIFEST_TABLE} target
+            USING manifest_deletes source
+            ON target.target = '{target}' AND target.movie_id = source.movie_id
+            WHEN MATCHED THEN
+                DELETE
+        """)
+
+def current_table_version() -> int:
+    return spark.sql(f"DESCRIBE HISTORY {MOVIES_TABLE} LIMIT 1").first()["version"]
+
+def get_last_synced_version(target: str) -> Optional[int]:
+    if not spark.catalog.tableExists(SYNC_STATE_TABLE):
+        return None
+    row = spark.table(SYNC_STATE_TABLE).filter(F.col("target") == target).first()
+    return row["last_version"] if row else None
+
+def save_synced_version(target: str, version: int):
+    spark.sql(f"""
+        MERGE INTO {SYNC_STATE_TABLE} target
+        USING (SELECT '{target}' AS target, {version} AS last_version, current_timestamp() AS synced_at) source
+        ON target.target = source.target
+        WHEN MATCHED THEN
+            UPDATE SET *
+        WHEN NOT MATCHED THEN
+            INSERT *
+    """)
+
+def read_changes(start_version: int, end_version: int):
+    """
+    Net effect of popcorn.movies commits start_version..end_version from the
+    change data feed.
+    
+    Returns:
+        (DataFrame of eligible inserted/updated movies to put,
+         list of movie_ids to delete: removed rows and rows that became ineligible)
+    """
+    feed = (
+        spark.read.format("delta")
+        .option("readChangeFeed", "true")
+        .option("startingVersion", start_version)
+        .option("endingVersion", end_version)
+        .table(MOVIES_TABLE)
+        .withColumn("eligible", F.coalesce(F.expr(ELIGIBLE_FILTER), F.lit(False)))
+    )
+    
+    # Whether each updated movie was eligible (i.e. in DynamoDB) before the range
+    earliest_first = Window.partitionBy("movie_id").orderBy("_commit_version")
+    before = (
+        feed.filter(F.col("_change_type") == "update_preimage")
+        .withColumn("rank", F.row_number().over(earliest_first))
+        .filter(F.col("rank") == 1)
+        .select("movie_id", F.col("eligible").alias("was_eligible"))
+    )
+    
+    latest_first = Window.partitionBy("movie_id").orderBy(F.desc("_commit_version"))
+    changes = (
+        feed.filter(F.col("_change_type") != "update_preimage")
+        .withColumn("rank", F.row_number().over(latest_first))
+        .filter(F.col("rank") == 1)
+        .join(before, "movie_id", "left")
+    )
+    upserts = (
+        changes.filter((F.col("_change_type") != "delete") & F.col("eligible"))
+        .drop("_change_type", "_commit_version", "_commit_timestamp", "rank", "eligible", "was_eligible")
+    )
+    # Movies that never qualified were never written, so they need no delete
+    deleted = changes.filter(
+        (F.col("_change_type") == "delete") | (~F.col("eligible") & F.coalesce(F.col("was_eligible"), F.lit(False)))
+    ).select("movie_id").collect()
+    return upserts, [row["movie_id"] for row in deleted]
+
+def sync_movies_to_dynamo(full: bool = False, force: bool = False, table_name: Optional[str] = None,
+                          encoding: Optional[str] = None) -> Dict[str, int]:
+    """
+    Main function to sync Delta table movies to DynamoDB.
+    
+    Writes to table_name, or by default to the currently published
+    catalog table in the encoding it was published with.
+    
+    Only rows changed since the last synced table version are pushed,
+    using the change data feed. The first sync, a sync whose starting
+    version is no longer in the feed, or full=True pushes every eligible
+    movie from a snapshot instead.
+    
+    Either way, movies whose item content hash matches the manifest of
+    what was last written are skipped; force=True rewrites them anyway.
+    
+    Returns:
+        The synced Delta version and counts of synced, unchanged and deleted movies
+    """
     try:
         print("Starting movie sync to DynamoDB...")
         
         # Get DynamoDB client
         dynamo_client = get_aws_client()
+        if table_name is None:
+            table_name, active_encoding = get_active_catalog(dynamo_client)
+            encoding = encoding or active_encoding
+        compact = encoding == catalog_codec.ENCODING_COMPACT
+        target = sync_target(table_name)
+        print(f"Syncing into {table_name} ({encoding or catalog_codec.ENCODING_FULL} encoding)")
+        
+        # Pin the version up front so commits landing during the sync are picked up next time
+        end_version = current_table_version()
+        last_version = None if full else get_last_synced_version(target)
+        delete_ids = []
         
-        # Read from Delta table
-        movies_df = spark.table("popcorn.movies")
-        movies_df = movies_df.filter("""
-            year IS NOT NULL 
-            AND size(streaming_platforms) > 0
-            AND title != ''
-            AND size(genres) > 0
-            AND image_url IS NOT NULL
-            AND summary != ''
-            AND size(ratings) > 0
-            AND content_rating IS NOT NULL
-        """) # to avoid null values
-        print(movies_df.count())
-        
-        # Convert to list of dictionaries
-        movies = movies_df.collect()
-        movies_list = [movie.asDict() for movie in movies]
-        
-        # Convert to DynamoDB format
-        dynamo_items = [convert_to_dynamo_format(movie) for movie in movies_list]
-        
-        print(f"Preparing to sync {len(dynamo_items)} movies to DynamoDB...")
+        if last_version is not None and last_version >= end_version:
+            print(f"Already synced up to version {end_version}, nothing to do")
+            return {"version": end_version, "synced": 0, "unchanged": 0, "deleted": 0}
+        
+        movies_df = None
+        if last_version is not None:
+            try:
+                movies_df, delete_ids = read_changes(last_version + 1, end_version)
+                print(f"Syncing changes from version {last_version + 1} to {end_version}")
+            except Exception as e:
+                print(f"Change data feed unavailable from version {last_version + 1} ({e}); running a full sync")
+        
+        if movies_df is None:
+            # Read from Delta table
+            movies_df = spark.read.format("delta").option("versionAsOf", end_version).table(MOVIES_TABLE)
+            movies_df = movies_df.filter(ELIGIBLE_FILTER) # to avoid null values
+            print(f"Full sync of version {end_version}")
+        
+        synced_hashes = None if force else manifest_df(target)
+        if synced_hashes is not None:
+            movies_df = movies_df.join(synced_hashes, "movie_id", "left")
+        
+        # Stream rows to the driver one partition at a time and convert them
+        # lazily; the writer pulls items only as it sends batches
+        warnings = Counter()
+        written_hashes = []
+        unchanged_count = 0
+        
+        def changed_items():
+            nonlocal unchanged_count
+            for row in movies_df.toLocalIterator(prefetchPartitions=True):
+                movie = row.asDict()
+                item = convert_to_dynamo_format(movie, warnings, compact)
+                if item['content_hash']['S'] == movie.get('synced_hash'):
+                    unchanged_count += 1
+                    continue
+                written_hashes.append((item['movie_id']['S'], item['content_hash']['S']))
+                yield item
+        
+        dynamo_items = changed_items()
+        delete_keys = [{'movie_id': {'S': str(movie_id)}} for movie_id in delete_ids]
+        
+        print(f"Streaming movies to DynamoDB ({len(delete_keys)} deletes queued)...")
         
         # Write to DynamoDB
-        batch_write_to_dynamo(
+        counts = batch_write_to_dynamo(
             dynamo_client, 
             dynamo_items,
-            "popcorn-movies"
+            table_name,
+            delete_keys=delete_keys
         )
+        if warnings:
+            print(f"Data warnings: {dict(warnings)}")
+        if counts["failed"]:
+            raise RuntimeError(f"{counts['failed']} of {counts['submitted']} writes failed")
+        
+        # Only advance once every write landed, so a failed sync is retried in full
+        update_manifest(target, written_hashes, delete_ids)
+        save_synced_version(target, end_version)
         
         print("Sync completed successfully!")
-        print(f"Total movies synced: {len(dynamo_items)}")
+        print(f"Total movies synced: {len(written_hashes)}, unchanged (skipped): {unchanged_count}, "
+              f"deleted: {len(delete_keys)}")
+        return {"version": end_version, "synced": len(written_hashes),
+                "unchanged": unchanged_count, "deleted": len(delete_keys)}
         
     except Exception as e:
         print(f"Error during sync: {str(e)}")
@@ -200,56 +559,113 @@ if __name__ == "__main__":
 
 # COMMAND ----------
 
-# DBTITLE 1,IF YOU WANT TO CLEAR THE TABLE
-def clear_dynamodb_table():
-    """Clear all items from the movies table."""
+# DBTITLE 1,PUBLISH A NEW CATALOG VERSION (blue/green)
+# Previous versions kept after a publish so the pointer can be flipped back
+KEEP_PREVIOUS_VERSIONS = 1
+
+def create_versioned_table(dynamo_client, table_name: str):
+    """Create an empty movies table with the same layout as popcorn-movies."""
+    dynamo_client.create_table(
+        TableName=table_name,
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[
+            {'AttributeName': 'movie_id', 'AttributeType': 'S'},
+            {'AttributeName': 'year', 'AttributeType': 'N'},
+            {'AttributeName': catalog_codec.SHARD_ATTR, 'AttributeType': 'N'}
+        ],
+        KeySchema=[{'AttributeName': 'movie_id', 'KeyType': 'HASH'}],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'YearIndex',
+            'KeySchema': [{'AttributeName': 'year', 'KeyType': 'HASH'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }, {
+            'IndexName': catalog_codec.SELECTION_INDEX,
+            'KeySchema': [{'AttributeName': catalog_codec.SHARD_ATTR, 'KeyType': 'HASH'}],
+            'Projection': {
+                'ProjectionType': 'INCLUDE',
+                'NonKeyAttributes': list(catalog_codec.SELECTION_ATTRIBUTES)
+            }
+        }],
+        Tags=[{'Key': 'Project', 'Value': 'Popcorn'}]
+    )
+    dynamo_client.get_waiter('table_exists').wait(TableName=table_name)
+
+def count_items(dynamo_client, table_name: str) -> int:
+    """Exact item count (DescribeTable's ItemCount lags by hours)."""
+    total = 0
+    for page in dynamo_client.get_paginator('scan').paginate(TableName=table_name, Select='COUNT'):
+        total += page['Count']
+    return total
+
+def flip_catalog_pointer(dynamo_client, new_table: str, expected_active: str, delta_version: int,
+                         encoding: str):
+    """
+    Point the Lambdas at new_table in one conditional write, failing if
+    another publish moved the pointer since expected_active was read.
+    """
+    dynamo_client.put_item(
+        TableName=CATALOG_TABLE,
+        Item={
+            'config_key': {'S': CATALOG_POINTER_KEY},
+            'active_table': {'S': new_table},
+            'previous_table': {'S': expected_active},
+            'encoding': {'S': encoding},
+            'delta_version': {'N': str(delta_version)},
+            'published_at': {'S': datetime.now().isoformat()}
+        },
+        ConditionExpression='attribute_not_exists(active_table) OR active_table = :expected',
+        ExpressionAttributeValues={':expected': {'S': expected_active}}
+    )
+
+def drop_old_versions(dynamo_client, keep: List[str]):
+    """Delete versioned catalog tables other than `keep`; each drop is one DeleteTable call."""
+    for page in dynamo_client.get_paginator('list_tables').paginate():
+        for table_name in page['TableNames']:
+            if table_name.startswith(VERSIONED_TABLE_PREFIX) and table_name not in keep:
+                print(f"Dropping old catalog version {table_name}")
+                dynamo_client.delete_table(TableName=table_name)
+
+def publish_catalog():
+    """
+    Rebuild the DynamoDB catalog without touching the table being read.
+    
+    A full sync goes into a new versioned table; once its item count matches
+    the eligible movies in the synced Delta version, the catalog pointer is
+    flipped to it and versions older than KEEP_PREVIOUS_VERSIONS are dropped.
+    """
     try:
-        # Get AWS credentials from secrets
-        AWS_ACCESS_KEY = dbutils.secrets.get("popcorn", "aws-access-key")
-        AWS_SECRET_KEY = dbutils.secrets.get("popcorn", "aws-secret-key")
-        AWS_REGION = "us-east-1"
-        
-        # Create DynamoDB resource
-        dynamo = boto3.resource(
-            'dynamodb',
-            aws_access_key_id=AWS_ACCESS_KEY,
-            aws_secret_access_key=AWS_SECRET_KEY,
-            region_name=AWS_REGION
-        )
-        
-        table = dynamo.Table('popcorn-movies')
-        
-        # Scan all items with pagination
-        items = []
-        last_evaluated_key = None
+        dynamo_client = get_aws_client()
+        previous_table = get_active_table(dynamo_client)
+        new_table = f"{VERSIONED_TABLE_PREFIX}{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
-        while True:
-            if last_evaluated_key:
-                response = table.scan(ExclusiveStartKey=last_evaluated_key)
-            else:
-                response = table.scan()
-                
-            items.extend(response.get('Items', []))
-            
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break
+        print(f"Publishing catalog to {new_table} (currently serving {previous_table})...")
+        create_versioned_table(dynamo_client, new_table)
+        result = sync_movies_to_dynamo(full=True, force=True, table_name=new_table, encoding=CATALOG_ENCODING)
         
-        print(f"Deleting {len(items)} items...")
+        # Validate before any reader can see the new table
+        expected = (
+            spark.read.format("delta").option("versionAsOf", result["version"]).table(MOVIES_TABLE)
+            .filter(ELIGIBLE_FILTER)
+            .count()
+        )
+        actual = count_items(dynamo_client, new_table)
+        if actual != expected:
+            raise RuntimeError(f"{new_table} has {actual} items, expected {expected}; not publishing")
         
-        # Delete items in batches
-        with table.batch_writer() as batch:
-            for item in items:
-                batch.delete_item(
-                    Key={
-                        'movie_id': item['movie_id']
-                    }
-                )
+        flip_catalog_pointer(dynamo_client, new_table, previous_table, result["version"], CATALOG_ENCODING)
+        print(f"Catalog pointer now serves {new_table} ({actual} movies)")
         
-        print("Successfully cleared movies table")
+        # The newest previous versions stay around for rollback
+        versions = sorted(
+            name for page in dynamo_client.get_paginator('list_tables').paginate()
+            for name in page['TableNames'] if name.startswith(VERSIONED_TABLE_PREFIX)
+        )
+        keep = [new_table] + [name for name in versions if name != new_table][-KEEP_PREVIOUS_VERSIONS:]
+        drop_old_versions(dynamo_client, keep)
         
     except Exception as e:
-        print(f"Error clearing table: {str(e)}")
+        print(f"Error publishing catalog: {str(e)}")
         raise
 
-clear_dynamodb_table()
\ No newline at end of file
+# Run manually to rebuild the catalog:
+# publish_catalog()
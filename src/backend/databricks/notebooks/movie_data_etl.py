@@ -1,12 +1,28 @@
 # Databricks notebook source
 # DBTITLE 1,Source & Configuration
 # Databricks notebook source
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
 import requests
+from requests.adapters import HTTPAdapter
+from pyspark.sql.window import Window
 from pyspark.sql.types import StructType, StructField, StringType, IntegerType, ArrayType, DoubleType, TimestampType
 from pyspark.sql.functions import size
 import pyspark.sql.functions as F
+from pyspark import StorageLevel
 
 # COMMAND ----------
 
@@ -15,6 +31,85 @@ TMDB_API_KEY = dbutils.secrets.get("popcorn", "tmdb-api-key")
 TMDB_ACCESS_TOKEN = dbutils.secrets.get("popcorn", "tmdb-access-token")
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 JUSTWATCH_BASE_URL = "https://api.justwatch.com/content"
+OMDB_API_KEY = dbutils.secrets.get("popcorn", "omdb-api-key")
+OMDB_BASE_URL = "https://www.omdbapi.com/"
+
+# Number of movies enriched concurrently (each movie makes its own provider calls)
+ENRICHMENT_WORKERS = 8
+# Distributed enrichment: Spark partitions, each with its own session, rate
+# limiter (a 1/ENRICHMENT_PARTITIONS share of HOST_RATE_LIMITS) and threads
+ENRICHMENT_PARTITIONS = 8
+PARTITION_WORKERS = 4
+REQUEST_TIMEOUT = 10  # seconds
+
+# Per-host request budgets as (requests per second, burst size).
+# TMDB allows roughly 50 req/s per IP; OMDb has no published per-second limit
+# so it is kept well below the point where it starts returning 429s.
+HOST_RATE_LIMITS = {
+    "api.themoviedb.org": (40.0, 40),
+    "www.omdbapi.com": (10.0, 10)
+}
+DEFAULT_RATE_LIMIT = (5.0, 5)
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 30.0  # seconds
+
+# On-disk HTTP response cache shared by reruns and development loops.
+#   "default" - serve fresh entries, revalidate/refetch stale ones
+#   "refresh" - always go to the network, but record what comes back
+#   "replay"  - serve only from the cache (any age) and never touch the network
+#   "off"     - no caching at all
+HTTP_CACHE_DIR = "/dbfs/tmp/popcorn/http_cache"
+HTTP_CACHE_MODE = "default"
+
+# Freshness per endpoint as (URL path pattern, seconds); first match wins.
+# Certifications almost never change, provider availability changes weekly-ish,
+# and movie details carry appended watch providers so they follow the short TTL.
+HTTP_CACHE_TTLS = [
+    (r"/movie/\d+/release_dates$", 30 * 86400),
+    (r"/movie/\d+/watch/providers$", 86400),
+    (r"/movie/\d+$", 86400),
+    (r"/genre/movie/list$", 30 * 86400),
+    (r"/movie/popular$", 6 * 3600),
+    (r"omdbapi\.com/$", 7 * 86400)
+]
+HTTP_CACHE_DEFAULT_TTL = 86400
+# Query parameters that carry credentials and must not affect the cache key
+HTTP_CACHE_IGNORED_PARAMS = {"apikey", "api_key"}
+
+# Incremental runs only re-enrich a field class once it is older than this.
+# Listing fields (title, genres, poster, TMDB score, ...) come with the
+# popular-list page and are always refreshed since they cost no extra calls.
+#   "details" - content_rating + streaming_platforms (one TMDB details call)
+#   "ratings" - OMDb ratings
+FIELD_STALENESS = {
+    "details": timedelta(days=3),
+    "ratings": timedelta(days=7)
+}
+
+# Runs checkpoint every CHECKPOINT_PAGES listing pages into STAGING_TABLE under
+# their run ID; a failed run is resumed from its completed batches if it is
+# restarted within RUN_RESUME_WINDOW, and finalized with a single MERGE
+STAGING_TABLE = "popcorn.movies_staging"
+CHECKPOINT_PAGES = 5
+RUN_RESUME_WINDOW = timedelta(days=1)
+
+# Popular-list runs and bootstraps number their batches independently, so
+# each only ever resumes a run of its own kind
+RUN_KIND_POPULAR = "popular"
+RUN_KIND_BOOTSTRAP = "bootstrap"
+
+# Bootstrap seeds the catalog from TMDB's daily export of every movie ID
+# (gzipped JSON lines, one {"id", "popularity", "adult", "video", ...} per line)
+TMDB_EXPORT_URL = "https://files.tmdb.org/p/exports/movie_ids_{date}.json.gz"  # date as MM_DD_YYYY
+BOOTSTRAP_MIN_POPULARITY = 10.0
+BOOTSTRAP_BATCH_SIZE = 500  # movie IDs enriched and checkpointed per batch
+
+# Columns covered by content_hash; a row is only rewritten when these change
+CONTENT_FIELDS = (
+    "title", "year", "genres", "image_url", "summary",
+    "content_rating", "ratings", "streaming_platforms"
+)
 
 # Update the headers for TMDB API calls to use the access token
 TMDB_HEADERS = {
@@ -44,11 +139,310 @@ movie_schema = StructType([
             StructField("url", StringType(), True)
         ])
     ), True),
-    StructField("last_updated", TimestampType(), True)
+    StructField("last_updated", TimestampType(), True),
+    StructField("details_updated", TimestampType(), True),
+    StructField("ratings_updated", TimestampType(), True),
+    StructField("content_hash", StringType(), True)
 ])
 
 
 
+# COMMAND ----------
+
+# DBTITLE 1,Rate-limited, cached HTTP client
+# COMMAND ----------
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.blocked_until - now
+            time.sleep(wait)
+    
+    def block_for(self, seconds: float):
+        """Pause every caller of this host, e.g. after a 429 with Retry-After."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for successful GET responses.
+    
+    Bodies are stored once under bodies/<sha256 of body>; each request
+    (URL plus sorted query parameters, minus credentials) has a small
+    index entry under index/<sha256 of request> pointing at its body and
+    recording when it was fetched and any ETag/Last-Modified validators.
+    Writes go through a temp file and os.replace so concurrent workers
+    never see partial files.
+    """
+    
+    def __init__(self, root: str = HTTP_CACHE_DIR, ttls: List[tuple] = None,
+                 default_ttl: int = HTTP_CACHE_DEFAULT_TTL):
+        self.root = root
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or HTTP_CACHE_TTLS)]
+        self.default_ttl = default_ttl
+        os.makedirs(os.path.join(root, "index"), exist_ok=True)
+        os.makedirs(os.path.join(root, "bodies"), exist_ok=True)
+    
+    @staticmethod
+    def request_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        query = sorted((k, str(v)) for k, v in (params or {}).items()
+                       if k not in HTTP_CACHE_IGNORED_PARAMS)
+        return hashlib.sha256(f"GET {url}?{urlencode(query)}".encode("utf-8")).hexdigest()
+    
+    def ttl_for(self, url: str) -> int:
+        parsed = urlparse(url)
+        target = parsed.netloc + parsed.path
+        for pattern, ttl in self.ttls:
+            if pattern.search(target):
+                return ttl
+        return self.default_ttl
+    
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.root, "index", f"{key}.json")
+    
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.root, "bodies", digest)
+    
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the index entry for `key` with its body loaded, or None."""
+        try:
+            with open(self._index_path(key), "r") as f:
+                entry = json.load(f)
+            with open(self._body_path(entry["body_sha256"]), "rb") as f:
+                entry["body"] = f.read()
+            return entry
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl_for(entry["url"])
+    
+    def store(self, key: str, url: str, response: requests.Response):
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = self._body_path(digest)
+        if not os.path.exists(body_path):
+            self._write_atomic(body_path, body)
+        entry = {
+            "url": url,
+            "status_code": response.status_code,
+            "content_type": response.headers.get("Content-Type"),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body_sha256": digest,
+            "fetched_at": time.time()
+        }
+        self._write_atomic(self._index_path(key), json.dumps(entry).encode("utf-8"))
+    
+    def touch(self, key: str, entry: Dict[str, Any]):
+        """Mark a revalidated (304) entry as freshly fetched."""
+        entry = {k: v for k, v in entry.items() if k != "body"}
+        entry["fetched_at"] = time.time()
+        self._write_atomic(self._index_path(key), json.dumps(entry).encode("utf-8"))
+    
+    @staticmethod
+    def to_response(entry: Dict[str, Any]) -> requests.Response:
+        """Rebuild a requests.Response so callers handle hits like live responses."""
+        response = requests.Response()
+        response.status_code = entry["status_code"]
+        response._content = entry["body"]
+        response.url = entry["url"]
+        response.encoding = "utf-8"
+        if entry.get("content_type"):
+            response.headers["Content-Type"] = entry["content_type"]
+        response.headers["X-Popcorn-Cache"] = "hit"
+        return response
+
+class RateLimitedClient:
+    """
+    HTTP client shared by all ETL fetchers.
+    
+    - one keep-alive session with a pool sized for the enrichment workers
+    - a token bucket per host so parallel workers stay under each provider's limit
+    - 429/5xx responses are retried, honoring Retry-After when present and
+      otherwise using full-jitter exponential backoff; a 429 also pauses
+      the whole host so other workers back off too
+    - an optional on-disk ResponseCache in front of all of the above
+      (see HTTP_CACHE_MODE)
+    - counters for requests, throttles, retries, failures and cache use
+    """
+    
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    COUNTERS = ("requests", "throttled", "retries", "failures", "cache_hits", "cache_misses", "revalidated")
+    
+    def __init__(self, rate_limits: Dict[str, tuple] = None, max_retries: int = MAX_RETRIES,
+                 pool_size: int = ENRICHMENT_WORKERS, cache: Optional[ResponseCache] = None,
+                 cache_mode: str = HTTP_CACHE_MODE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.rate_limits = rate_limits or HOST_RATE_LIMITS
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.cache = cache
+        self.cache_mode = cache_mode if cache is not None else "off"
+        self.counters = {name: 0 for name in self.COUNTERS}
+    
+    def __getstate__(self):
+        # Sessions and locks cannot be pickled; ship only the configuration so a
+        # client captured by a Spark closure arrives on the executor as a fresh one
+        return {
+            "rate_limits": self.rate_limits,
+            "max_retries": self.max_retries,
+            "pool_size": self.pool_size,
+            "cache": self.cache,
+            "cache_mode": self.cache_mode
+        }
+    
+    def __setstate__(self, state):
+        self.__init__(**state)
+    
+    def _bucket(self, host: str) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                rate, burst = self.rate_limits.get(host, DEFAULT_RATE_LIMIT)
+                self.buckets[host] = TokenBucket(rate, burst)
+            return self.buckets[host]
+    
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+    
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+    
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET through the response cache, then with rate limiting and
+        retries. Returns the final response (callers still call
+        raise_for_status) or raises the last connection error once retries
+        are exhausted. In replay mode a cache miss raises ConnectionError.
+        """
+        if self.cache_mode == "off":
+            return self._fetch(url, **kwargs)
+        
+        key = self.cache.request_key(url, kwargs.get("params"))
+        entry = self.cache.lookup(key) if self.cache_mode != "refresh" else None
+        
+        if entry and (self.cache_mode == "replay" or self.cache.is_fresh(entry)):
+            self._count("cache_hits")
+            return self.cache.to_response(entry)
+        if self.cache_mode == "replay":
+            self._count("cache_misses")
+            raise requests.ConnectionError(f"No cached response for {url} (replay mode)")
+        
+        # Stale entries are revalidated with their validators when the provider sent any
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        
+        response = self._fetch(url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            self._count("revalidated")
+            self.cache.touch(key, entry)
+            return self.cache.to_response(entry)
+        
+        self._count("cache_misses")
+        if response.status_code == 200:
+            try:
+                self.cache.store(key, url, response)
+            except OSError as e:
+                print(f"Could not cache response for {url}: {e}")
+        return response
+    
+    def _fetch(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        bucket = self._bucket(urlparse(url).netloc)
+        
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            self._count("requests")
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                time.sleep(self._backoff(attempt))
+                continue
+            
+            if response.status_code not in self.RETRY_STATUSES:
+                return response
+            
+            delay = self._retry_after(response)
+            if response.status_code == 429:
+                self._count("throttled")
+                bucket.block_for(delay if delay is not None else self._backoff(attempt))
+            if attempt == self.max_retries:
+                self._count("failures")
+                return response
+            
+            self._count("retries")
+            time.sleep(delay if delay is not None else self._backoff(attempt))
+        
+        return response
+    
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+_http_client = None
+
+def get_http_client() -> RateLimitedClient:
+    """Return the process-wide rate-limited client, cached per HTTP_CACHE_MODE."""
+    global _http_client
+    if _http_client is None:
+        cache = ResponseCache() if HTTP_CACHE_MODE != "off" else None
+        _http_client = RateLimitedClient(cache=cache, cache_mode=HTTP_CACHE_MODE)
+    return _http_client
+
 # COMMAND ----------
 
 # DBTITLE 1,TMDB FETCH movies
@@ -71,7 +465,7 @@ def fetch_movies_from_tmdb(page: int = 1) -> Dict[str, Any]:
     }
     
     try:
-        response = requests.get(url, headers=TMDB_HEADERS, params=params)
+        response = get_http_client().get(url, headers=TMDB_HEADERS, params=params)
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
@@ -94,20 +488,38 @@ def fetch_movie_release_info(movie_id: str) -> Dict[str, Any]:
         Dictionary containing release date information or None if error
     """
     url = f"{TMDB_BASE_URL}/movie/{movie_id}/release_dates"
-    max_retries = 3
-    retry_count = 0
     
-    while retry_count < max_retries:
-        try:
-            response = requests.get(url, headers=TMDB_HEADERS)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            retry_count += 1
-            if retry_count == max_retries:
-                print(f"Failed to fetch release info for movie {movie_id} after {max_retries} attempts: {e}")
-                return None
-            print(f"Retry {retry_count} of {max_retries} for movie {movie_id}")
+    # Retries and backoff are handled by the rate-limited client
+    try:
+        response = get_http_client().get(url, headers=TMDB_HEADERS)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        print(f"Failed to fetch release info for movie {movie_id}: {e}")
+        return None
+
+def parse_content_rating(release_info: Optional[Dict[str, Any]], movie_id: str = "") -> Optional[str]:
+    """
+    Pick the first non-empty US certification from a release dates payload.
+    
+    Args:
+        release_info: Response of /release_dates (or the appended
+            "release_dates" section of a movie details response)
+        movie_id: TMDB movie ID, for error messages
+        
+    Returns:
+        Certification such as "PG-13", or None if unavailable
+    """
+    if not release_info or "results" not in release_info:
+        return None
+    try:
+        us_release = next((r for r in release_info["results"] if r["iso_3166_1"] == "US"), None)
+        if us_release and us_release.get("release_dates"):
+            certifications = [rd.get("certification") for rd in us_release["release_dates"] 
+                            if rd.get("certification") and rd.get("certification").strip()]
+            return next(iter(certifications), None) if certifications else None
+    except Exception as e:
+        print(f"Error processing certification for movie {movie_id}: {e}")
     return None
 
 # COMMAND ----------
@@ -115,22 +527,32 @@ def fetch_movie_release_info(movie_id: str) -> Dict[str, Any]:
 # DBTITLE 1,TMDB FETCH genres
 # COMMAND ----------
 
+_genre_mapping = None
+
 def fetch_genre_list() -> Dict[int, str]:
     """
     Fetch list of movie genres from TMDB and create a mapping of ID to name.
     
+    The mapping is fetched once per process and reused; a failed fetch is
+    not remembered, so the next caller tries again.
+    
     Returns:
         Dictionary mapping genre IDs to genre names
     """
+    global _genre_mapping
+    if _genre_mapping:
+        return _genre_mapping
+    
     url = f"{TMDB_BASE_URL}/genre/movie/list"
     
     try:
-        response = requests.get(url, headers=TMDB_HEADERS)
+        response = get_http_client().get(url, headers=TMDB_HEADERS)
         response.raise_for_status()
         genres_data = response.json()
         
         # Create a mapping of genre_id to genre_name
-        return {genre['id']: genre['name'] for genre in genres_data.get('genres', [])}
+        _genre_mapping = {genre['id']: genre['name'] for genre in genres_data.get('genres', [])}
+        return _genre_mapping
     except requests.RequestException as e:
         print(f"Error fetching genre list: {e}")
         return {}
@@ -138,6 +560,59 @@ def fetch_genre_list() -> Dict[int, str]:
 # COMMAND ----------
 
 # DBTITLE 1,TMDB FETCH streaming platforms
+# Platform name mapping for cleaner results
+PLATFORM_CLEANUP = {
+    "Max Amazon Channel": "Max",
+    "HBO Max": "Max",
+    "Netflix Amazon Channel": "Netflix",
+    "Hulu Amazon Channel": "Hulu",
+    "Disney Plus": "Disney+",
+    "Peacock Premium": "Peacock",
+    "Peacock Premium Plus": "Peacock"
+}
+
+# List of platforms we want to include
+VALID_PLATFORMS = {
+    "Netflix", "Max", "Hulu", "Disney+", "Prime Video", 
+    "Apple TV+", "Peacock", "Paramount+"
+}
+
+def parse_streaming_platforms(providers_data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Extract US subscription/free platforms from a TMDB watch providers payload.
+    
+    Args:
+        providers_data: Response of /watch/providers (or the appended
+            "watch/providers" section of a movie details response)
+        
+    Returns:
+        List of dictionaries containing platform information
+    """
+    # Get US streaming data
+    us_data = (providers_data or {}).get('results', {}).get('US', {})
+    
+    # Get flatrate (subscription) streaming options
+    streaming_platforms = []
+    seen_platforms = set()  # To avoid duplicates
+    
+    # Combine flatrate and free options
+    providers = us_data.get('flatrate', []) + us_data.get('free', [])
+    
+    for provider in providers:
+        platform_name = provider.get('provider_name', '')
+        # Clean up platform name if needed
+        platform_name = PLATFORM_CLEANUP.get(platform_name, platform_name)
+        
+        # Only add if it's a valid streaming platform and we haven't seen it yet
+        if platform_name in VALID_PLATFORMS and platform_name not in seen_platforms:
+            streaming_platforms.append({
+                "platform": platform_name,
+                "url": None  # We won't store URLs for MVP
+            })
+            seen_platforms.add(platform_name)
+        
+    return streaming_platforms
+
 def fetch_streaming_availability(movie_id: str) -> List[Dict[str, str]]:
     """
     Fetch streaming availability using TMDB's watch providers endpoint.
@@ -150,52 +625,10 @@ def fetch_streaming_availability(movie_id: str) -> List[Dict[str, str]]:
     """
     url = f"{TMDB_BASE_URL}/movie/{movie_id}/watch/providers"
     
-    # Platform name mapping for cleaner results
-    platform_cleanup = {
-        "Max Amazon Channel": "Max",
-        "HBO Max": "Max",
-        "Netflix Amazon Channel": "Netflix",
-        "Hulu Amazon Channel": "Hulu",
-        "Disney Plus": "Disney+",
-        "Peacock Premium": "Peacock",
-        "Peacock Premium Plus": "Peacock"
-    }
-    
-    # List of platforms we want to include
-    valid_platforms = {
-        "Netflix", "Max", "Hulu", "Disney+", "Prime Video", 
-        "Apple TV+", "Peacock", "Paramount+"
-    }
-    
     try:
-        response = requests.get(url, headers=TMDB_HEADERS)
+        response = get_http_client().get(url, headers=TMDB_HEADERS)
         response.raise_for_status()
-        data = response.json()
-        
-        # Get US streaming data
-        us_data = data.get('results', {}).get('US', {})
-        
-        # Get flatrate (subscription) streaming options
-        streaming_platforms = []
-        seen_platforms = set()  # To avoid duplicates
-        
-        # Combine flatrate and free options
-        providers = us_data.get('flatrate', []) + us_data.get('free', [])
-        
-        for provider in providers:
-            platform_name = provider.get('provider_name', '')
-            # Clean up platform name if needed
-            platform_name = platform_cleanup.get(platform_name, platform_name)
-            
-            # Only add if it's a valid streaming platform and we haven't seen it yet
-            if platform_name in valid_platforms and platform_name not in seen_platforms:
-                streaming_platforms.append({
-                    "platform": platform_name,
-                    "url": None  # We won't store URLs for MVP
-                })
-                seen_platforms.add(platform_name)
-            
-        return streaming_platforms
+        return parse_streaming_platforms(response.json())
         
     except requests.RequestException as e:
         print(f"Error fetching streaming data for movie {movie_id}: {e}")
@@ -203,21 +636,52 @@ def fetch_streaming_availability(movie_id: str) -> List[Dict[str, str]]:
 
 # COMMAND ----------
 
+# DBTITLE 1,TMDB FETCH movie details (certification + providers in one call)
+def fetch_movie_details(movie_id: str, client: Optional[RateLimitedClient] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch movie details with release dates and watch providers appended,
+    replacing separate /release_dates and /watch/providers requests.
+    
+    Args:
+        movie_id: TMDB movie ID
+        client: HTTP client to use (defaults to the process-wide one)
+        
+    Returns:
+        Movie details dictionary with "release_dates" and "watch/providers"
+        sections, or None if error
+    """
+    url = f"{TMDB_BASE_URL}/movie/{movie_id}"
+    params = {
+        "append_to_response": "release_dates,watch/providers",
+        "language": "en-US"
+    }
+    
+    try:
+        response = (client or get_http_client()).get(url, headers=TMDB_HEADERS, params=params)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        print(f"Failed to fetch details for movie {movie_id}: {e}")
+        return None
+
+# COMMAND ----------
+
 # DBTITLE 1,OMDb FETCH movie ratings
-def fetch_omdb_data(title: str, year: int = None) -> Dict[str, Any]:
+def fetch_omdb_data(title: str, year: int = None,
+                    client: Optional[RateLimitedClient] = None) -> Optional[List[Dict[str, Any]]]:
     """
     Fetch movie ratings from OMDB API.
     
     Args:
         title: Movie title
         year: Release year (optional)
+        client: HTTP client to use (defaults to the process-wide one)
         
     Returns:
-        Dictionary containing rating information
+        List of rating dictionaries (empty if OMDb has no such movie), or
+        None if the request failed and the result says nothing about the
+        movie (timeout, 5xx, exhausted quota)
     """
-    OMDB_API_KEY = dbutils.secrets.get("popcorn", "omdb-api-key")
-    OMDB_BASE_URL = "https://www.omdbapi.com/"  # Changed to https
-    
     params = {
         'apikey': OMDB_API_KEY,
         't': title,
@@ -227,7 +691,7 @@ def fetch_omdb_data(title: str, year: int = None) -> Dict[str, Any]:
         params['y'] = year
         
     try:
-        response = requests.get(OMDB_BASE_URL, params=params)
+        response = (client or get_http_client()).get(OMDB_BASE_URL, params=params)
         response.raise_for_status()
         data = response.json()
         
@@ -262,171 +726,758 @@ def fetch_omdb_data(title: str, year: int = None) -> Dict[str, Any]:
                     })
             
             return ratings
-        return []
+        
+        # OMDb reports quota and key problems as Response=False too
+        if data.get('Error') == 'Movie not found!':
+            return []
+        print(f"OMDB error for {title} ({year}): {data.get('Error')}")
+        return None
         
     except (requests.RequestException, ValueError) as e:
         print(f"Error fetching OMDB data for {title} ({year}): {e}")
-        return []
+        return None
+
+# COMMAND ----------
+
+# DBTITLE 1,Incremental state
+def content_hash(movie: Dict[str, Any]) -> str:
+    """Stable hash of a movie's CONTENT_FIELDS, ignoring bookkeeping timestamps."""
+    content = {field: movie.get(field) for field in CONTENT_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def is_stale(updated_at: Optional[datetime], field_class: str, now: datetime) -> bool:
+    """True if a field class was never fetched or is older than FIELD_STALENESS allows."""
+    return updated_at is None or now - updated_at >= FIELD_STALENESS[field_class]
+
+# Columns of popcorn.movies an incremental run needs to reuse fresh enrichment
+EXISTING_STATE_COLUMNS = (
+    "content_rating", "ratings", "streaming_platforms", "last_updated",
+    "details_updated", "ratings_updated", "content_hash"
+)
+
+def existing_movies_df():
+    """
+    Current state of popcorn.movies as (movie_id, existing struct), joined onto
+    the raw movies so an incremental run can reuse fresh enrichment and
+    detect unchanged rows.
+    """
+    return spark.table("popcorn.movies").select(
+        "movie_id", F.struct(*EXISTING_STATE_COLUMNS).alias("existing")
+    )
+
+def write_action(movie: Dict[str, Any], existing: Optional[Dict[str, Any]]) -> str:
+    """
+    How a transformed movie should be written:
+      "changed"   - new movie or content_hash differs; full upsert
+      "refreshed" - enrichment refetched but content identical; bump timestamps only
+      "untouched" - nothing to write
+    """
+    if not existing or movie["content_hash"] != existing.get("content_hash"):
+        return "changed"
+    if (movie["details_updated"] != existing.get("details_updated")
+            or movie["ratings_updated"] != existing.get("ratings_updated")):
+        return "refreshed"
+    return "untouched"
+
+# COMMAND ----------
+
+# DBTITLE 1,Eligibility
+# Reasons a listing entry is dropped before enrichment. These mirror the
+# filter in movie_data_dynamo_sync, checked with the free list payload only.
+LISTING_SKIP_REASONS = ("no_title", "no_year", "no_poster", "no_summary", "no_genres")
+
+ELIGIBILITY_COUNTERS = ("eligible", "skipped_omdb", "calls_saved", "omdb_failed") + tuple(
+    f"skipped_{reason}" for reason in LISTING_SKIP_REASONS
+)
+
+class EnrichmentStats:
+    """Thread-safe counters for the eligibility stage."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {name: 0 for name in ELIGIBILITY_COUNTERS}
+    
+    def add(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
+    
+    def as_dict(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+def movie_genre_ids(movie: Dict[str, Any]) -> List[int]:
+    """Genre IDs from a listing entry ("genre_ids") or a details response ("genres")."""
+    if "genre_ids" in movie:
+        return movie["genre_ids"]
+    return [genre["id"] for genre in movie.get("genres", [])]
+
+def listing_ineligibility(movie: Dict[str, Any], genre_mapping: Dict[int, str]) -> Optional[str]:
+    """
+    Reason a raw TMDB listing entry can never be synced to DynamoDB, or None
+    if it is worth enriching.
+    """
+    if not movie.get("title"):
+        return "no_title"
+    if not movie.get("release_date"):
+        return "no_year"
+    if not movie.get("poster_path"):
+        return "no_poster"
+    if not (movie.get("overview") or "").strip():
+        return "no_summary"
+    # Without a genre map there is nothing to check against
+    if genre_mapping and not any(genre_id in genre_mapping for genre_id in movie_genre_ids(movie)):
+        return "no_genres"
+    return None
+
+def details_eligible(content_rating: Optional[str], streaming_platforms: List[Dict[str, str]]) -> bool:
+    """Movies without a certification or a streaming platform are dropped by the sync."""
+    return bool(content_rating) and bool(streaming_platforms)
 
 # COMMAND ----------
 
 # DBTITLE 1,reformat Function
 # COMMAND ----------
 
-def transform_movie_data(raw_movies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def transform_movie(movie: Dict[str, Any], genre_mapping: Dict[int, str],
+                    existing: Optional[Dict[str, Any]] = None,
+                    now: Optional[datetime] = None,
+                    client: Optional[RateLimitedClient] = None,
+                    stats: Optional[EnrichmentStats] = None) -> Optional[Dict[str, Any]]:
+    """
+    Enrich a single raw TMDB movie with certification, streaming and OMDb data.
+    
+    The TMDB details call runs first because it is the cheapest one that can
+    disqualify a movie; OMDb is skipped for movies it rules out.
+    
+    Args:
+        movie: Raw movie data from TMDB
+        genre_mapping: Mapping of genre IDs to genre names
+        existing: Current popcorn.movies row for this movie (incremental runs);
+            field classes that are still fresh are reused instead of refetched
+        now: Run timestamp used for staleness checks and bookkeeping
+        client: HTTP client to use (defaults to the process-wide one)
+        stats: Eligibility counters to update
+        
+    Returns:
+        Transformed movie dictionary, or None if the movie has no ID
+    """
+    movie_id = str(movie.get("id", ""))
+    if not movie_id:
+        print("Skipping movie with no ID")
+        return None
+    
+    now = now or datetime.now()
+    existing = existing or {}
+    stats = stats or EnrichmentStats()
+    
+    # One TMDB request returns both certifications and watch providers;
+    # bootstrap entries already are that response
+    if "release_dates" in movie:
+        details = movie
+    elif is_stale(existing.get("details_updated"), "details", now):
+        details = fetch_movie_details(movie_id, client)
+    else:
+        details = None
+    if details or "details_updated" not in existing:
+        # Get US rating if available, otherwise None
+        content_rating = parse_content_rating((details or {}).get("release_dates"), movie_id)
+        # Get streaming platforms
+        streaming_platforms = parse_streaming_platforms((details or {}).get("watch/providers"))
+        # A failed fetch leaves the class stale so the next run retries it
+        details_updated = now if details else None
+    else:
+        # Still fresh, or the refetch failed: keep what the table already has
+        content_rating = existing.get("content_rating")
+        streaming_platforms = existing.get("streaming_platforms") or []
+        details_updated = existing.get("details_updated")
+    
+    # Transform genre IDs to names
+    genre_ids = movie_genre_ids(movie)
+    genres = [genre_mapping.get(genre_id) for genre_id in genre_ids if genre_id in genre_mapping]
+    
+    # Get base TMDB rating
+    ratings = [
+        {
+            "source": "TMDB",
+            "score": movie.get("vote_average", 0.0),
+            "max_score": 10.0
+        }
+    ]
+    
+    # Get additional ratings from OMDB, unless the details already rule the movie out
+    year = int(movie.get("release_date", "").split("-")[0]) if movie.get("release_date") else None
+    ratings_stale = is_stale(existing.get("ratings_updated"), "ratings", now)
+    eligible = details_eligible(content_rating, streaming_platforms)
+    omdb_ratings = None
+    if ratings_stale and eligible:
+        omdb_ratings = fetch_omdb_data(movie.get("title", ""), year, client)
+        if omdb_ratings is None:
+            # A failed fetch leaves the class stale so the next run retries it
+            stats.add("omdb_failed")
+        else:
+            ratings_updated = now
+    elif ratings_stale:
+        stats.add("skipped_omdb")
+        stats.add("calls_saved")
+    if omdb_ratings is None:
+        # Still fresh, skipped or the refetch failed: keep what the table already has
+        omdb_ratings = [r for r in existing.get("ratings") or [] if r["source"] != "TMDB"]
+        ratings_updated = existing.get("ratings_updated")
+    if eligible:
+        stats.add("eligible")
+    ratings.extend(omdb_ratings)
+
+    transformed = {
+        "movie_id": movie_id,
+        "title": movie.get("title", "Unknown Title"),
+        "year": year,
+        "genres": genres,  # Now populated with genre names
+        "image_url": f"https://image.tmdb.org/t/p/w500{movie.get('poster_path')}" if movie.get("poster_path") else None,
+        "summary": movie.get("overview", ""),
+        "content_rating": content_rating,
+        "ratings": ratings,  # Now includes TMDB, IMDB, Rotten Tomatoes, and Metacritic,
+        "streaming_platforms": streaming_platforms,  # Now populated with actual data
+        "details_updated": details_updated,
+        "ratings_updated": ratings_updated
+    }
+    transformed["content_hash"] = content_hash(transformed)
+    
+    # last_updated only moves when the content actually changed
+    unchanged = transformed["content_hash"] == existing.get("content_hash")
+    transformed["last_updated"] = existing.get("last_updated") if unchanged else now
+    return transformed
+
+def transform_movie_data(raw_movies: List[Dict[str, Any]], max_workers: int = ENRICHMENT_WORKERS,
+                         existing_movies: Optional[Dict[str, Dict[str, Any]]] = None,
+                         genre_mapping: Optional[Dict[int, str]] = None,
+                         client: Optional[RateLimitedClient] = None,
+                         now: Optional[datetime] = None,
+                         stats: Optional[EnrichmentStats] = None) -> List[Dict[str, Any]]:
     """
     Transform raw movie data into our schema format.
     
+    Listing entries that could never be synced are dropped before any API
+    call. The rest are enriched concurrently on a bounded thread pool sharing
+    one keep-alive session; a failure in one movie never affects the others.
+    
     Args:
-        raw_movies: List of raw movie data from TMDB
+        raw_movies: List of raw movie data from TMDB; entries with only an
+            "id" (bootstrap) are hydrated from the details endpoint first
+        max_workers: Number of movies enriched in parallel
+        existing_movies: Current popcorn.movies rows by movie_id; when given,
+            only stale field classes are refetched
+        genre_mapping: Genre ID to name mapping; fetched when not provided
+        client: HTTP client to use (defaults to the process-wide one)
+        now: Run timestamp (defaults to the current time)
+        stats: Eligibility counters to update; printed here when not provided
         
     Returns:
-        List of transformed movie dictionaries
+        List of transformed movie dictionaries, in input order
     """
     # Fetch genre mapping once for all movies
-    genre_mapping = fetch_genre_list()
-    if not genre_mapping:
-        print("Warning: Could not fetch genre mapping. Genre information will be limited.")
+    if genre_mapping is None:
+        genre_mapping = fetch_genre_list()
+        if not genre_mapping:
+            print("Warning: Could not fetch genre mapping. Genre information will be limited.")
     
     transformed_movies = []
     failed_movies = []
+    existing_movies = existing_movies or {}
+    now = now or datetime.now()
+    report_stats = stats is None
+    stats = stats or EnrichmentStats()
     
+    # Bootstrap entries carry only an ID; their listing fields (and certification
+    # and providers) come from one details call each
+    stubs = [movie for movie in raw_movies if "title" not in movie and movie.get("id")]
+    hydrated = {}
+    if stubs:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            hydrated = dict(zip(
+                [movie["id"] for movie in stubs],
+                executor.map(lambda movie: fetch_movie_details(str(movie["id"]), client), stubs)
+            ))
+        raw_movies = [hydrated.get(movie.get("id")) or movie for movie in raw_movies]
+    
+    # Cheap checks on the list payload first; each skipped movie saves every
+    # call its stale field classes would have made
+    eligible_movies = []
     for movie in raw_movies:
-        try:
-            movie_id = str(movie.get("id", ""))
-            if not movie_id:
-                print("Skipping movie with no ID")
-                continue
-                
-            release_info = fetch_movie_release_info(movie_id)
-            
-            # Get US rating if available, otherwise None
-            content_rating = None
-            if release_info and "results" in release_info:
-                try:
-                    us_release = next((r for r in release_info["results"] if r["iso_3166_1"] == "US"), None)
-                    if us_release and us_release.get("release_dates"):
-                        certifications = [rd.get("certification") for rd in us_release["release_dates"] 
-                                        if rd.get("certification") and rd.get("certification").strip()]
-                        content_rating = next(iter(certifications), None) if certifications else None
-                except Exception as e:
-                    print(f"Error processing certification for movie {movie_id}: {e}")
-                    content_rating = None
-            
-            # Transform genre IDs to names
-            genre_ids = movie.get("genre_ids", [])
-            genres = [genre_mapping.get(genre_id) for genre_id in genre_ids if genre_id in genre_mapping]
-            
-            # Get streaming platforms
-            streaming_platforms = fetch_streaming_availability(movie_id)
-
-            # Get base TMDB rating
-            ratings = [
-                {
-                    "source": "TMDB",
-                    "score": movie.get("vote_average", 0.0),
-                    "max_score": 10.0
-                }
-            ]
-            
-            # Get additional ratings from OMDB
-            year = int(movie.get("release_date", "").split("-")[0]) if movie.get("release_date") else None
-            omdb_ratings = fetch_omdb_data(movie.get("title", ""), year)
-            ratings.extend(omdb_ratings)
-
-            transformed = {
-                "movie_id": movie_id,
-                "title": movie.get("title", "Unknown Title"),
-                "year": int(movie.get("release_date", "").split("-")[0]) if movie.get("release_date") else None,
-                "genres": genres,  # Now populated with genre names
-                "image_url": f"https://image.tmdb.org/t/p/w500{movie.get('poster_path')}" if movie.get("poster_path") else None,
-                "summary": movie.get("overview", ""),
-                "content_rating": content_rating,
-                "ratings": ratings,  # Now includes TMDB, IMDB, Rotten Tomatoes, and Metacritic,
-                "streaming_platforms": streaming_platforms,  # Now populated with actual data
-                "last_updated": datetime.now()
-            }
-            transformed_movies.append(transformed)
-            
-        except Exception as e:
-            failed_movies.append(movie_id)
-            print(f"Error transforming movie {movie.get('id', 'unknown')}: {e}")
+        reason = listing_ineligibility(movie, genre_mapping)
+        if reason is None:
+            eligible_movies.append(movie)
             continue
+        existing = existing_movies.get(str(movie.get("id", ""))) or {}
+        stats.add(f"skipped_{reason}")
+        # A stub whose hydration failed already spent its details call
+        details_saved = movie.get("id") not in hydrated and is_stale(existing.get("details_updated"), "details", now)
+        stats.add("calls_saved", details_saved + is_stale(existing.get("ratings_updated"), "ratings", now))
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (movie, executor.submit(transform_movie, movie, genre_mapping,
+                                    existing_movies.get(str(movie.get("id", ""))), now, client, stats))
+            for movie in eligible_movies
+        ]
+        
+        for movie, future in futures:
+            try:
+                transformed = future.result()
+                if transformed:
+                    transformed_movies.append(transformed)
+            except Exception as e:
+                failed_movies.append(str(movie.get("id", "unknown")))
+                print(f"Error transforming movie {movie.get('id', 'unknown')}: {e}")
     
     if failed_movies:
         print(f"Failed to process {len(failed_movies)} movies: {failed_movies}")
     
     print(f"Successfully transformed {len(transformed_movies)} movies")
+    if report_stats:
+        print(f"Eligibility stats: {stats.as_dict()}")
     return transformed_movies
 
 # COMMAND ----------
 
-# DBTITLE 1,main
+# DBTITLE 1,Distributed enrichment
+# Output of the enrichment stage: a movie row plus how it should be written
+enriched_schema = StructType(movie_schema.fields + [StructField("write_action", StringType(), False)])
+
+def partition_rate_limits(num_partitions: int) -> Dict[str, tuple]:
+    """Split each host budget across partitions so the cluster as a whole stays under it."""
+    return {
+        host: (rate / num_partitions, max(1, burst // num_partitions))
+        for host, (rate, burst) in HOST_RATE_LIMITS.items()
+    }
+
+def sum_counters(partition_counters: List[Dict[str, int]], names: tuple) -> Dict[str, int]:
+    return {name: sum(counters.get(name, 0) for counters in partition_counters) for name in names}
+
+def enrich_movies_distributed(raw_movies: List[Dict[str, Any]], incremental: bool = True,
+                              num_partitions: int = ENRICHMENT_PARTITIONS):
+    """
+    Enrich raw TMDB movies on the executors.
+    
+    The raw listing rows become a DataFrame (joined with the current table
+    state on incremental runs) that is repartitioned and enriched with
+    mapPartitions. Every partition builds its own keep-alive session and
+    rate limiter and runs PARTITION_WORKERS threads over its movies, so
+    throughput grows with the cluster instead of one driver thread.
+    
+    Each partition also emits one record with its HTTP and eligibility
+    counters. They are summed from the materialized output rather than with
+    accumulators, so task retries and speculative execution cannot count
+    a partition twice.
+    
+    Args:
+        raw_movies: Raw movie data from the TMDB listing pages, already
+            deduplicated by ID
+        incremental: Join the existing table state so fresh enrichment is reused
+        num_partitions: Number of enrichment partitions
+        
+    Returns:
+        Persisted DataFrame with enriched_schema
+    """
+    # Fetch genre mapping once on the driver and ship it with the closure
+    genre_mapping = fetch_genre_list()
+    if not genre_mapping:
+        print("Warning: Could not fetch genre mapping. Genre information will be limited.")
+    
+    rate_limits = partition_rate_limits(num_partitions)
+    cache_mode = HTTP_CACHE_MODE
+    now = datetime.now()
+    
+    def enrich_partition(rows):
+        rows = list(rows)
+        if not rows:
+            return
+        client = RateLimitedClient(
+            rate_limits=rate_limits,
+            pool_size=PARTITION_WORKERS,
+            cache=ResponseCache() if cache_mode != "off" else None,
+            cache_mode=cache_mode
+        )
+        existing_movies = {
+            row["movie_id"]: row["existing"].asDict(recursive=True)
+            for row in rows if row["existing"] is not None
+        }
+        stats = EnrichmentStats()
+        transformed = transform_movie_data(
+            [json.loads(row["raw"]) for row in rows],
+            max_workers=PARTITION_WORKERS,
+            existing_movies=existing_movies,
+            genre_mapping=genre_mapping,
+            client=client,
+            now=now,
+            stats=stats
+        )
+        for movie in transformed:
+            action = write_action(movie, existing_movies.get(movie["movie_id"]))
+            yield "movie", tuple(movie[field.name] for field in movie_schema.fields) + (action,)
+        yield "stats", (client.stats(), stats.as_dict())
+    
+    raw_df = spark.createDataFrame(
+        [(str(movie["id"]), json.dumps(movie)) for movie in raw_movies if movie.get("id")],
+        "movie_id STRING, raw STRING"
+    )
+    if incremental:
+        raw_df = raw_df.join(existing_movies_df(), "movie_id", "left")
+    else:
+        raw_df = raw_df.withColumn("existing", F.lit(None))
+    
+    # Materialize once so the API work is not repeated by later actions
+    output = raw_df.repartition(num_partitions).rdd.mapPartitions(enrich_partition).persist(StorageLevel.MEMORY_AND_DISK)
+    partition_stats = output.filter(lambda record: record[0] == "stats").map(lambda record: record[1]).collect()
+    
+    enriched_df = spark.createDataFrame(
+        output.filter(lambda record: record[0] == "movie").map(lambda record: record[1]),
+        schema=enriched_schema
+    ).persist(StorageLevel.MEMORY_AND_DISK)
+    print(f"Enriched {enriched_df.count()} movies on {num_partitions} partitions")
+    output.unpersist()
+    
+    print(f"HTTP stats: {sum_counters([http for http, _ in partition_stats], RateLimitedClient.COUNTERS)}")
+    print(f"Eligibility stats: {sum_counters([eligibility for _, eligibility in partition_stats], ELIGIBILITY_COUNTERS)}")
+    return enriched_df
+
 # COMMAND ----------
 
-def main(num_pages: int = 50):
+# DBTITLE 1,Checkpoints
+def new_run_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+def checkpoint_table():
+    """The staging table, or None if it does not exist or predates run_kind (nothing resumable)."""
+    if not spark.catalog.tableExists(STAGING_TABLE):
+        return None
+    staging = spark.table(STAGING_TABLE)
+    return staging if "run_kind" in staging.columns else None
+
+def find_resumable_run(run_kind: str) -> Optional[str]:
+    """Most recent run of `run_kind` that checkpointed within RUN_RESUME_WINDOW but never finalized."""
+    staging = checkpoint_table()
+    if staging is None:
+        return None
+    latest = (
+        staging
+        .filter(F.col("checkpointed_at") >= F.lit(datetime.now() - RUN_RESUME_WINDOW))
+        .filter(F.col("run_kind") == run_kind)
+        .groupBy("run_id")
+        .agg(F.max("checkpointed_at").alias("last_checkpoint"))
+        .orderBy(F.desc("last_checkpoint"))
+        .first()
+    )
+    return latest["run_id"] if latest else None
+
+def run_info(run_id: str) -> Optional[Dict[str, Any]]:
+    """The kind and pinned source a run checkpointed with, or None if it has no checkpoints."""
+    staging = checkpoint_table()
+    if staging is None:
+        return None
+    row = staging.filter(F.col("run_id") == run_id).select("run_kind", "source").first()
+    return row.asDict() if row else None
+
+def resolve_run(run_kind: str, run_id: Optional[str], resume: bool) -> tuple:
     """
-    Main ETL process for movie data.
+    Run ID to use plus what its checkpoints recorded (None for a new run).
+    An explicit run_id must belong to a run of the same kind.
+    """
+    run_id = run_id or (find_resumable_run(run_kind) if resume else None)
+    if not run_id:
+        return new_run_id(), None
+    info = run_info(run_id)
+    if info and info["run_kind"] != run_kind:
+        raise ValueError(f"Run {run_id} is a {info['run_kind']} run, not {run_kind}")
+    return run_id, info
+
+def completed_batches(run_id: str) -> set:
+    if not spark.catalog.tableExists(STAGING_TABLE):
+        return set()
+    rows = spark.table(STAGING_TABLE).filter(F.col("run_id") == run_id).select("batch_id").distinct().collect()
+    return {row["batch_id"] for row in rows}
+
+def checkpoint_batch(enriched_df, run_id: str, batch_id: int, run_kind: str, source: Optional[str] = None):
+    """
+    Append one enriched batch to the staging table; the Delta append is the
+    checkpoint. Every row records the run kind and the source its batch IDs
+    refer to, so a resumed run maps them to the same input.
+    """
+    (enriched_df
+        .withColumn("run_id", F.lit(run_id))
+        .withColumn("batch_id", F.lit(batch_id))
+        .withColumn("run_kind", F.lit(run_kind))
+        .withColumn("source", F.lit(source).cast(StringType()))
+        .withColumn("checkpointed_at", F.current_timestamp())
+        .write.format("delta").mode("append")
+        # Staging tables created before run_kind/source existed gain the columns
+        .option("mergeSchema", "true")
+        .saveAsTable(STAGING_TABLE))
+
+def staged_movies(run_id: str):
+    """
+    Everything a run has checkpointed, one row per movie. A movie can move
+    between listing pages while a run is in progress; the latest batch wins.
+    """
+    latest_first = Window.partitionBy("movie_id").orderBy(F.desc("batch_id"))
+    return (
+        spark.table(STAGING_TABLE)
+        .filter(F.col("run_id") == run_id)
+        .withColumn("rank", F.row_number().over(latest_first))
+        .filter(F.col("rank") == 1)
+        .select(*[field.name for field in enriched_schema.fields])
+    )
+
+def staged_movie_ids(run_id: str) -> set:
+    """IDs a run has already checkpointed, so a resumed run does not enrich them again."""
+    if not spark.catalog.tableExists(STAGING_TABLE):
+        return set()
+    rows = spark.table(STAGING_TABLE).filter(F.col("run_id") == run_id).select("movie_id").distinct().collect()
+    return {row["movie_id"] for row in rows}
+
+def clear_run(run_id: str):
+    spark.sql(f"DELETE FROM {STAGING_TABLE} WHERE run_id = '{run_id}'")
+
+# COMMAND ----------
+
+# DBTITLE 1,TMDB daily ID export (bootstrap)
+def export_url(day: Optional[datetime] = None) -> str:
+    """URL of the TMDB movie ID export for `day`; defaults to yesterday's, which is always published."""
+    day = day or (datetime.utcnow() - timedelta(days=1))
+    return TMDB_EXPORT_URL.format(date=day.strftime("%m_%d_%Y"))
+
+def open_id_export(source: str):
+    """
+    Open a TMDB ID export as a stream of text lines without loading it.
     
     Args:
-        num_pages: Number of pages of movies to fetch (20 movies per page)
+        source: Export URL, or a local path to a gzipped (.gz) or plain
+            JSON-lines file such as the test fixture
     """
-    print("Starting movie data ETL process...")
-    all_transformed_movies = []
+    if source.startswith(("http://", "https://")):
+        response = requests.get(source, stream=True, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        # Read the raw gzip bytes and inflate them incrementally
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=response.raw), encoding="utf-8")
+    if source.endswith(".gz"):
+        return gzip.open(source, "rt", encoding="utf-8")
+    return open(source, "r", encoding="utf-8")
+
+def iter_export_ids(source: str, min_popularity: float = BOOTSTRAP_MIN_POPULARITY) -> Iterator[int]:
+    """
+    Yield movie IDs from a TMDB ID export line by line, skipping adult and
+    video entries and anything below min_popularity.
+    """
+    with open_id_export(source) as lines:
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("adult") or entry.get("video"):
+                continue
+            if (entry.get("popularity") or 0) < min_popularity:
+                continue
+            yield entry["id"]
+
+def batched(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterator into lists of at most `size` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def bootstrap_catalog(source: Optional[str] = None, min_popularity: float = BOOTSTRAP_MIN_POPULARITY,
+                      batch_size: int = BOOTSTRAP_BATCH_SIZE, cache_mode: Optional[str] = None,
+                      run_id: Optional[str] = None, resume: bool = True):
+    """
+    Seed popcorn.movies from a TMDB daily ID export instead of the popular list.
+    
+    The export is streamed and filtered on the driver and fed to the
+    distributed enrichment stage batch_size IDs at a time, so driver memory
+    stays constant however large the catalog. Batches are checkpointed like
+    main() runs and the whole bootstrap is finalized with one MERGE.
+    
+    Args:
+        source: Export URL or local file; defaults to yesterday's export. A
+            resumed bootstrap always reuses the source it started with
+        min_popularity: Minimum TMDB popularity for a movie to be enriched
+        batch_size: Movie IDs per enrichment batch / checkpoint
+        cache_mode: Override HTTP_CACHE_MODE for this run
+        run_id: Resume this specific run instead of looking one up
+        resume: Continue the latest unfinished bootstrap rather than starting a new one
+    """
+    set_cache_mode(cache_mode)
     
     try:
-        for page in range(1, num_pages + 1):
-            print(f"\nProcessing page {page} of {num_pages}...")
-            
-            # Fetch movies
-            raw_data = fetch_movies_from_tmdb(page=page)
-            if not raw_data or "results" not in raw_data:
-                print(f"No movie data received for page {page}, skipping...")
+        run_id, info = resolve_run(RUN_KIND_BOOTSTRAP, run_id, resume)
+        if info:
+            # Batch IDs only mean something against the export they were cut from
+            if source and source != info["source"]:
+                raise ValueError(f"Run {run_id} was started from {info['source']}, not {source}")
+            source = info["source"]
+        source = source or export_url()
+        print(f"Bootstrapping catalog from {source} (popularity >= {min_popularity})...")
+        done = completed_batches(run_id)
+        print(f"Run {run_id}: {len(done)} batch(es) already checkpointed")
+        
+        for batch_id, movie_ids in enumerate(batched(iter_export_ids(source, min_popularity), batch_size)):
+            if batch_id in done:
                 continue
-                
-            # Transform data
-            transformed_movies = transform_movie_data(raw_data["results"])
-            if transformed_movies:
-                all_transformed_movies.extend(transformed_movies)
             
-        if not all_transformed_movies:
-            raise ValueError("No movies were successfully transformed")
+            enriched_df = enrich_movies_distributed([{"id": movie_id} for movie_id in movie_ids])
+            checkpoint_batch(enriched_df, run_id, batch_id, RUN_KIND_BOOTSTRAP, source)
+            enriched_df.unpersist()
+            print(f"Checkpointed batch {batch_id} ({len(movie_ids)} movie IDs)")
         
-        # Convert to DataFrame
-        movies_df = spark.createDataFrame(all_transformed_movies, schema=movie_schema)
-        
-        # Deduplicate by movie_id, keeping the most recent data
-        movies_df = movies_df.dropDuplicates(['movie_id'])
+        finalize_run(run_id)
         
+    except Exception as e:
+        print(f"Error in catalog bootstrap: {e}")
+        raise
+
+# COMMAND ----------
+
+# DBTITLE 1,main
+# COMMAND ----------
+
+def set_cache_mode(cache_mode: Optional[str]):
+    """Override HTTP_CACHE_MODE for this run; the shared client is rebuilt on next use."""
+    global HTTP_CACHE_MODE, _http_client
+    if cache_mode is not None:
+        HTTP_CACHE_MODE = cache_mode
+        _http_client = None
+
+def finalize_run(run_id: str):
+    """
+    MERGE everything a run has checkpointed into popcorn.movies in one
+    statement, print the run statistics and drop the run's checkpoints.
+    """
+    enriched_df = staged_movies(run_id).persist(StorageLevel.MEMORY_AND_DISK)
+    total_count = enriched_df.count()
+    if not total_count:
+        raise ValueError("No movies were successfully transformed")
+    
+    action_counts = {row["write_action"]: row["count"] for row in enriched_df.groupBy("write_action").count().collect()}
+    print(f"\n{action_counts.get('changed', 0)} changed, {action_counts.get('refreshed', 0)} refetched but unchanged, "
+          f"{action_counts.get('untouched', 0)} untouched")
+    
+    # Only rows that changed, or whose enrichment was refetched, need writing
+    movies_df = enriched_df.filter(F.col("write_action") != "untouched").drop("write_action")
+    
+    if action_counts.get("changed", 0) + action_counts.get("refreshed", 0):
         print(f"\nWriting {movies_df.count()} movies to Delta table...")
-        
+    
         # Create temp view of new data
         movies_df.createOrReplaceTempView("movies_updates")
-        
-        # Merge into existing table
+    
+        # Merge into existing table; unchanged content only bumps the
+        # enrichment timestamps so the movie is not refetched next run
         spark.sql("""
             MERGE INTO popcorn.movies target
             USING (SELECT * FROM movies_updates) source
             ON target.movie_id = source.movie_id
+            WHEN MATCHED AND target.content_hash = source.content_hash THEN
+                UPDATE SET
+                    target.details_updated = source.details_updated,
+                    target.ratings_updated = source.ratings_updated
             WHEN MATCHED THEN
                 UPDATE SET *
             WHEN NOT MATCHED THEN
                 INSERT *
         """)
+    
+    print("\nETL process completed successfully!")
+    print(f"Total movies processed: {total_count}")
+    
+    # Get some statistics about streaming platforms
+    movies_with_streaming = enriched_df.filter(size("streaming_platforms") > 0)
+    streaming_count = movies_with_streaming.count()
+    
+    # Get statistics about ratings
+    movies_with_ratings = enriched_df.filter(size("ratings") > 1)  # More than just TMDB rating
+    ratings_count = movies_with_ratings.count()
+    
+    print(f"Movies with streaming data: {streaming_count} ({(streaming_count/total_count*100):.1f}%)")
+    print(f"Movies with multiple ratings: {ratings_count} ({(ratings_count/total_count*100):.1f}%)")
+    
+    enriched_df.unpersist()
+    # The run is merged; drop its checkpoints so it is never resumed
+    clear_run(run_id)
+
+def main(num_pages: int = 50, cache_mode: Optional[str] = None, incremental: bool = True,
+         run_id: Optional[str] = None, resume: bool = True):
+    """
+    Main ETL process for movie data.
+    
+    Pages are processed in batches of CHECKPOINT_PAGES; each enriched batch
+    is checkpointed to STAGING_TABLE under the run ID, and the run is
+    finalized with one MERGE into popcorn.movies once every batch is staged.
+    
+    Args:
+        num_pages: Number of pages of movies to fetch (20 movies per page)
+        cache_mode: Override HTTP_CACHE_MODE for this run, e.g. "replay"
+            to rebuild the table from cached responses without network
+        incremental: Reuse enrichment that is still fresh per FIELD_STALENESS
+            and only MERGE rows whose content changed; False refetches and
+            rewrites every movie
+        run_id: Resume this specific run instead of looking one up
+        resume: Continue the latest unfinished run (see RUN_RESUME_WINDOW)
+            rather than starting a new one
+    """
+    set_cache_mode(cache_mode)
+    print("Starting movie data ETL process...")
+    
+    try:
+        run_id, _ = resolve_run(RUN_KIND_POPULAR, run_id, resume)
+        done = completed_batches(run_id)
+        print(f"Run {run_id}: {len(done)} batch(es) already checkpointed")
         
-        print("\nETL process completed successfully!")
-        print(f"Total movies processed: {len(all_transformed_movies)}")
-        
-        # Get some statistics about streaming platforms
-        movies_with_streaming = movies_df.filter(size("streaming_platforms") > 0)
-        streaming_count = movies_with_streaming.count()
+        # The popular list shifts while a run is in progress, so the same movie
+        # can show up on several pages; each ID is enriched once per run
+        seen_ids = staged_movie_ids(run_id) if done else set()
+        duplicate_count = 0
         
-        # Get statistics about ratings
-        movies_with_ratings = movies_df.filter(size("ratings") > 1)  # More than just TMDB rating
-        ratings_count = movies_with_ratings.count()
+        batch_starts = range(1, num_pages + 1, CHECKPOINT_PAGES)
+        for batch_id, first_page in enumerate(batch_starts):
+            last_page = min(first_page + CHECKPOINT_PAGES - 1, num_pages)
+            if batch_id in done:
+                print(f"\nPages {first_page}-{last_page} already checkpointed, skipping...")
+                continue
+            
+            # Listing pages are cheap and sequential; fetch them on the driver
+            raw_movies = []
+            for page in range(first_page, last_page + 1):
+                print(f"\nFetching page {page} of {num_pages}...")
+                
+                # Fetch movies
+                raw_data = fetch_movies_from_tmdb(page=page)
+                if not raw_data or "results" not in raw_data:
+                    print(f"No movie data received for page {page}, skipping...")
+                    continue
+                for movie in raw_data["results"]:
+                    movie_id = str(movie.get("id", ""))
+                    if movie_id in seen_ids:
+                        duplicate_count += 1
+                        continue
+                    seen_ids.add(movie_id)
+                    raw_movies.append(movie)
+            
+            if not raw_movies:
+                print(f"No movies fetched for pages {first_page}-{last_page}")
+                continue
+            
+            # Enrichment (the expensive per-movie API calls) runs on the executors
+            enriched_df = enrich_movies_distributed(raw_movies, incremental=incremental)
+            checkpoint_batch(enriched_df, run_id, batch_id, RUN_KIND_POPULAR)
+            enriched_df.unpersist()
+            print(f"Checkpointed batch {batch_id} (pages {first_page}-{last_page})")
         
-        print(f"Movies with streaming data: {streaming_count} ({(streaming_count/len(all_transformed_movies)*100):.1f}%)")
-        print(f"Movies with multiple ratings: {ratings_count} ({(ratings_count/len(all_transformed_movies)*100):.1f}%)")
+        print(f"\nSkipped {duplicate_count} duplicate listing entries")
+        finalize_run(run_id)
         
     except Exception as e:
         print(f"Error in ETL process: {e}")
@@ -542,7 +1593,7 @@ def fetch_specific_movie(title: str) -> Dict[str, Any]:
     }
     
     try:
-        response = requests.get(url, headers=TMDB_HEADERS, params=params)
+        response = get_http_client().get(url, headers=TMDB_HEADERS, params=params)
         response.raise_for_status()
         data = response.json()
         return data['results'][0] if data.get('results') else None
@@ -577,11 +1628,26 @@ print("Testing OMDB ratings processing...")
 
 test_ratings = fetch_omdb_data("The Dark Knight", 2008)
 print("\nRatings for The Dark Knight:")
-for rating in test_ratings:
+if test_ratings is None:
+    print("- OMDB request failed")
+for rating in test_ratings or []:
     print(f"- {rating['source']}: {rating['score']}/{rating['max_score']}")
 
 # COMMAND ----------
 
+# DBTITLE 1,Test bootstrap ID export with the local fixture
+# COMMAND ----------
+
+# Streams the fixture the same way as the real export; no network needed
+BOOTSTRAP_FIXTURE = "../../../../tests/databricks/movie_ids_fixture.json.gz"
+
+fixture_ids = list(iter_export_ids(BOOTSTRAP_FIXTURE, min_popularity=BOOTSTRAP_MIN_POPULARITY))
+print(f"{len(fixture_ids)} movie IDs at popularity >= {BOOTSTRAP_MIN_POPULARITY}: {fixture_ids}")
+for batch_id, movie_ids in enumerate(batched(iter(fixture_ids), 3)):
+    print(f"Batch {batch_id}: {movie_ids}")
+
+# COMMAND ----------
+
 # DBTITLE 1,Test after running main()
 # MAGIC %sql
 # MAGIC -- COMMAND ----------
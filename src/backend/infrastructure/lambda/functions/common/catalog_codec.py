@@ -0,0 +1,140 @@
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Compact catalog encoding, shared by the Databricks sync (writer) and the
+# selection Lambdas (readers). Besides the full movie attributes, compact
+# items carry a small "selection projection" that is the only thing
+# projected into SelectionIndex, so filtering the catalog scans a few dozen
+# bytes per movie instead of whole items.
+#
+# The code tables are append-only: a value's code is its position, so
+# entries must never be reordered or removed once items are encoded.
+GENRE_CODES = (
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
+    'Drama', 'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery',
+    'Romance', 'Science Fiction', 'TV Movie', 'Thriller', 'War', 'Western'
+)
+PLATFORM_CODES = (
+    'Netflix', 'Max', 'Hulu', 'Disney+', 'Prime Video', 'Apple TV+',
+    'Peacock', 'Paramount+'
+)
+RATING_SOURCES = ('TMDB', 'IMDB', 'Rotten Tomatoes', 'Metacritic')
+
+ENCODING_FULL = 'full'
+ENCODING_COMPACT = 'compact'
+
+# Sparse GSI holding only the selection projection; items get a shard so
+# writes spread over a few index partitions
+SELECTION_INDEX = 'SelectionIndex'
+SELECTION_SHARDS = 4
+
+# Selection projection attributes (names are kept short since they are
+# stored, and read, once per movie)
+SHARD_ATTR = 'sel_shard'
+GENRES_ATTR = 'g'  # bitmask of GENRE_CODES
+PLATFORMS_ATTR = 'p'  # bitmask of PLATFORM_CODES
+RATINGS_ATTR = 'r'  # packed ratings, see pack_rating
+EXTRA_GENRES_ATTR = 'gx'  # genre names missing from GENRE_CODES
+EXTRA_PLATFORMS_ATTR = 'px'  # platform names missing from PLATFORM_CODES
+SELECTION_ATTRIBUTES = ('year', GENRES_ATTR, PLATFORMS_ATTR, RATINGS_ATTR,
+                        EXTRA_GENRES_ATTR, EXTRA_PLATFORMS_ATTR)
+
+# Packed ratings are source_code * RATING_SCALE + score in tenths of a percent
+RATING_SCALE = 10000
+
+_genre_bits = {name: 1 << code for code, name in enumerate(GENRE_CODES)}
+_platform_bits = {name: 1 << code for code, name in enumerate(PLATFORM_CODES)}
+
+def _encode_names(names: Iterable[str], bits: Dict[str, int]) -> Tuple[int, List[str]]:
+    mask, extras = 0, []
+    for name in names:
+        if name in bits:
+            mask |= bits[name]
+        elif name not in extras:
+            extras.append(name)
+    return mask, extras
+
+def _decode_names(mask: int, codes: Tuple[str, ...], extras: Optional[Iterable[str]]) -> List[str]:
+    names = [name for code, name in enumerate(codes) if mask >> code & 1]
+    return names + list(extras or [])
+
+def encode_genres(genres: Iterable[str]) -> Tuple[int, List[str]]:
+    """Genre names as a GENRE_CODES bitmask plus any names without a code."""
+    return _encode_names(genres, _genre_bits)
+
+def decode_genres(mask: int, extras: Optional[Iterable[str]] = None) -> List[str]:
+    return _decode_names(int(mask), GENRE_CODES, extras)
+
+def encode_platforms(platforms: Iterable[str]) -> Tuple[int, List[str]]:
+    """Platform names as a PLATFORM_CODES bitmask plus any names without a code."""
+    return _encode_names(platforms, _platform_bits)
+
+def decode_platforms(mask: int, extras: Optional[Iterable[str]] = None) -> List[str]:
+    return _decode_names(int(mask), PLATFORM_CODES, extras)
+
+def pack_rating(source: str, score: Any, max_score: Any) -> Optional[int]:
+    """
+    Pack one rating into a single number: the source code and the score
+    normalized to 0-1000 (tenths of a percent). Returns None for sources
+    without a code or ratings missing a value.
+    """
+    if source not in RATING_SOURCES or score is None or not max_score:
+        return None
+    normalized = round(float(score) / float(max_score) * 1000)
+    return RATING_SOURCES.index(source) * RATING_SCALE + max(0, min(1000, normalized))
+
+def unpack_rating(packed: Any) -> Dict[str, Any]:
+    """Inverse of pack_rating; scores come back out of 100."""
+    code, normalized = divmod(int(packed), RATING_SCALE)
+    return {'source': RATING_SOURCES[code], 'score': normalized / 10, 'max_score': 100.0}
+
+def selection_shard(movie_id: Any) -> int:
+    return zlib.crc32(str(movie_id).encode('utf-8')) % SELECTION_SHARDS
+
+def encode_selection(movie_id: Any, genres: Iterable[str], platforms: Iterable[str],
+                     ratings: Iterable[Tuple[str, Any, Any]]) -> Dict[str, Any]:
+    """
+    Selection projection attributes for one movie, as plain Python values.
+    `ratings` are (source, score, max_score) tuples. The extra-name lists
+    are only present when a genre or platform has no code yet.
+    """
+    genre_mask, extra_genres = encode_genres(genres)
+    platform_mask, extra_platforms = encode_platforms(platforms)
+    packed = [pack_rating(*rating) for rating in ratings]
+
+    attributes = {
+        SHARD_ATTR: selection_shard(movie_id),
+        GENRES_ATTR: genre_mask,
+        PLATFORMS_ATTR: platform_mask,
+        RATINGS_ATTR: [p for p in packed if p is not None]
+    }
+    if extra_genres:
+        attributes[EXTRA_GENRES_ATTR] = extra_genres
+    if extra_platforms:
+        attributes[EXTRA_PLATFORMS_ATTR] = extra_platforms
+    return attributes
+
+def decode_selection(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Selection view of a SelectionIndex entry: movie_id, year, genre and
+    platform names, and unpacked ratings.
+    """
+    year = item.get('year')
+    return {
+        'movie_id': item['movie_id'],
+        'year': int(year) if year is not None else None,
+        'genres': decode_genres(item.get(GENRES_ATTR, 0), item.get(EXTRA_GENRES_ATTR)),
+        'platforms': decode_platforms(item.get(PLATFORMS_ATTR, 0), item.get(EXTRA_PLATFORMS_ATTR)),
+        'ratings': [unpack_rating(p) for p in item.get(RATINGS_ATTR, [])]
+    }
+
+def selection_view(movie: Dict[str, Any]) -> Dict[str, Any]:
+    """The same view as decode_selection, built from a full movie item."""
+    year = movie.get('year')
+    return {
+        'movie_id': movie['movie_id'],
+        'year': int(year) if year is not None else None,
+        'genres': list(movie.get('genres') or []),
+        'platforms': [p['platform'] for p in movie.get('streaming_platforms') or []],
+        'ratings': list(movie.get('ratings') or [])
+    }
@@ -0,0 +1,125 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+from botocore.exceptions import ClientError
+from common import metrics_util
+from common.catalog_codec import (
+    ENCODING_COMPACT, ENCODING_FULL, SELECTION_INDEX, SELECTION_ATTRIBUTES,
+    decode_selection, selection_view
+)
+
+# The catalog sync publishes each rebuild into a fresh versioned table and
+# then flips this pointer record in the catalog table to it
+CATALOG_POINTER_KEY = 'movies'
+
+# Warm containers re-read the pointer at most this often
+POINTER_CACHE_SECONDS = 60
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+_active_table = {'name': None, 'encoding': ENCODING_FULL, 'expires_at': 0.0}
+
+def _refresh_pointer(dynamodb) -> None:
+    now = time.time()
+    if _active_table['name'] and now < _active_table['expires_at']:
+        return
+
+    name = _active_table['name'] or os.environ['MOVIES_TABLE_NAME']
+    encoding = _active_table['encoding']
+    catalog_table_name = os.environ.get('CATALOG_TABLE_NAME')
+    if catalog_table_name:
+        try:
+            response = dynamodb.Table(catalog_table_name).get_item(
+                Key={'config_key': CATALOG_POINTER_KEY}
+            )
+            pointer = response.get('Item', {})
+            name = pointer.get('active_table') or os.environ['MOVIES_TABLE_NAME']
+            encoding = pointer.get('encoding', ENCODING_FULL)
+        except ClientError:
+            pass
+
+    _active_table.update(name=name, encoding=encoding, expires_at=now + POINTER_CACHE_SECONDS)
+
+def get_active_movies_table_name(dynamodb) -> str:
+    """
+    Name of the movies table currently published by the catalog sync.
+
+    Falls back to MOVIES_TABLE_NAME when no catalog table is configured or
+    nothing has been published yet. If the pointer cannot be read, the last
+    known table keeps being used.
+    """
+    _refresh_pointer(dynamodb)
+    return _active_table['name']
+
+def get_catalog_encoding(dynamodb) -> str:
+    """Encoding of the published movies table ('full' or 'compact', see catalog_codec)."""
+    _refresh_pointer(dynamodb)
+    return _active_table['encoding']
+
+def get_movies_table(dynamodb):
+    """DynamoDB Table resource for the currently published movies catalog."""
+    return dynamodb.Table(get_active_movies_table_name(dynamodb))
+
+def _scan_all(table, **kwargs) -> List[Dict[str, Any]]:
+    response = table.scan(**kwargs)
+    items = response['Items']
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
+        items.extend(response['Items'])
+    return items
+
+def scan_selection(dynamodb) -> List[Dict[str, Any]]:
+    """
+    Selection view (movie_id, year, genres, platforms, ratings) of every
+    movie in the catalog.
+
+    Compact catalogs are read from SelectionIndex, which holds only the
+    encoded selection projection; full catalogs fall back to scanning the
+    table. Use get_movies to load the full items of the movies picked.
+    """
+    table = get_movies_table(dynamodb)
+    with metrics_util.span('catalog_scan'):
+        if get_catalog_encoding(dynamodb) == ENCODING_COMPACT:
+            names = {f'#a{i}': name for i, name in enumerate(SELECTION_ATTRIBUTES)}
+            items = _scan_all(
+                table,
+                IndexName=SELECTION_INDEX,
+                ProjectionExpression=', '.join(['movie_id'] + list(names)),
+                ExpressionAttributeNames=names
+            )
+            movies = [decode_selection(item) for item in items]
+        else:
+            items = _scan_all(
+                table,
+                ProjectionExpression='movie_id, #y, genres, streaming_platforms, ratings',
+                ExpressionAttributeNames={'#y': 'year'}
+            )
+            movies = [selection_view(item) for item in items]
+    metrics_util.count('movies_scanned', len(movies))
+    return movies
+
+@metrics_util.timed('catalog_batch_get')
+def get_movies(dynamodb, movie_ids: List[str], projection: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Full catalog items for `movie_ids`, in the same order, via BatchGetItem.
+    IDs no longer in the catalog are skipped.
+    """
+    table_name = get_active_movies_table_name(dynamodb)
+    found = {}
+    unique_ids = list(dict.fromkeys(movie_ids))
+    for start in range(0, len(unique_ids), BATCH_GET_SIZE):
+        request = {'Keys': [{'movie_id': movie_id} for movie_id in unique_ids[start:start + BATCH_GET_SIZE]]}
+        if projection:
+            request['ProjectionExpression'] = projection
+        request_items = {table_name: request}
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response['Responses'].get(table_name, []):
+                found[item['movie_id']] = item
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                time.sleep(min(0.05 * 2 ** attempt, 1.0))
+    return [found[movie_id] for movie_id in unique_ids if movie_id in found]
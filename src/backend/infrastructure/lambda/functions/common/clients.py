@@ -0,0 +1,52 @@
+import sys
+import time
+from functools import lru_cache
+
+# Shared AWS/OpenAI clients, built on first use and then reused for the
+# life of the container. Heavy packages are imported inside the accessors
+# so a handler only pays for what its code path actually touches: openai
+# alone adds several hundred milliseconds to a cold start.
+OPENAI_SECRET_NAME = 'popcorn/openai'
+SECRETS_REGION = 'us-east-1'
+
+# A rotated OpenAI key is picked up within this many seconds, or on the
+# next call after OpenAI rejects the cached one
+SECRET_TTL_SECONDS = 300
+
+_openai_key = {'value': None, 'expires_at': 0.0}
+_openai_client = {'key': None, 'client': None}
+
+@lru_cache(maxsize=None)
+def dynamodb():
+    import boto3
+    return boto3.resource('dynamodb')
+
+@lru_cache(maxsize=None)
+def secretsmanager():
+    import boto3
+    return boto3.client('secretsmanager', region_name=SECRETS_REGION)
+
+def openai_api_key() -> str:
+    """OpenAI API key from Secrets Manager, re-read at most every SECRET_TTL_SECONDS."""
+    now = time.time()
+    if _openai_key['value'] is None or now >= _openai_key['expires_at']:
+        secret = secretsmanager().get_secret_value(SecretId=OPENAI_SECRET_NAME)['SecretString']
+        _openai_key.update(value=secret, expires_at=now + SECRET_TTL_SECONDS)
+    return _openai_key['value']
+
+def openai_client(timeout: float = 120.0):
+    """OpenAI client for the current key; only rebuilt when the key or timeout changes."""
+    key = (openai_api_key(), timeout)
+    if _openai_client['key'] != key:
+        from openai import OpenAI
+        _openai_client.update(key=key, client=OpenAI(api_key=key[0], timeout=timeout))
+    return _openai_client['client']
+
+def reset_openai_key_on_auth_error(error: Exception) -> None:
+    """Drop the cached key if OpenAI rejected it, so the next call re-reads the secret."""
+    # Nothing can have been rejected before openai was ever imported
+    if 'openai' not in sys.modules:
+        return
+    from openai import AuthenticationError
+    if isinstance(error, AuthenticationError):
+        _openai_key['expires_at'] = 0.0
@@ -1,19 +1,55 @@
-import json
 import logging
+import os
+import random
+import time
 import traceback
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Union
+from common.serialization import dumps
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARN': 30, 'ERROR': 40}
+_STDLIB_LEVELS = {'DEBUG': logging.DEBUG, 'INFO': logging.INFO, 'WARN': logging.WARNING, 'ERROR': logging.ERROR}
+
+# Messages below this level are dropped before any formatting happens
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+if LOG_LEVEL not in LEVELS:
+    LOG_LEVEL = 'INFO'
+
+# Messages logged with a sampling `key` (per movie, per member, ...): the
+# first LOG_SAMPLE_FIRST per key and invocation are emitted, later ones
+# with probability LOG_SAMPLE_RATE; the rest are only counted
+SAMPLE_FIRST = int(os.environ.get('LOG_SAMPLE_FIRST', '3'))
+SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+
+# A buffered logger emits early once it holds this many entries
+MAX_BUFFERED_ENTRIES = 500
 
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(_STDLIB_LEVELS[LOG_LEVEL])
+
+# Messages and extras may be passed as zero-argument callables, which are
+# only called if the message is actually emitted
+Message = Union[str, Callable[[], str]]
+Extra = Union[Dict[str, Any], Callable[[], Dict[str, Any]], None]
 
 class LambdaLogger:
-    def __init__(self, function_name: str, event: Dict[str, Any]):
+    def __init__(self, function_name: str, event: Optional[Dict[str, Any]] = None,
+                 level: Optional[str] = None, buffered: bool = False):
         self.function_name = function_name
         self.request_id = None
-        if 'requestContext' in event:
+        if event and 'requestContext' in event:
             self.request_id = event['requestContext'].get('requestId')
-        
+        self.level = LEVELS[level or LOG_LEVEL]
+        self.buffered = buffered
+        self._buffer = []
+        self._started = time.time()
+        self._sample_counts = {}
+        self._suppressed = {}
+
+    def enabled(self, level: str) -> bool:
+        """True if messages at `level` would be emitted; use to guard expensive log-only work."""
+        return LEVELS[level] >= self.level
+
     def _format_log(self, level: str, message: str, extra: Optional[Dict] = None) -> Dict:
         log_data = {
             'timestamp': datetime.utcnow().isoformat(),
@@ -21,34 +57,89 @@ class LambdaLogger:
             'function': self.function_name,
             'message': message
         }
-        
+
         if self.request_id:
             log_data['request_id'] = self.request_id
-            
+
         if extra:
             log_data.update(extra)
-            
+
         return log_data
-        
-    def info(self, message: str, extra: Optional[Dict] = None):
-        log_entry = self._format_log('INFO', message, extra)
-        logger.info(json.dumps(log_entry))
-        
-    def error(self, message: str, error: Optional[Exception] = None, extra: Optional[Dict] = None):
-        error_data = extra or {}
+
+    def _sampled_out(self, key: str) -> bool:
+        seen = self._sample_counts.get(key, 0) + 1
+        self._sample_counts[key] = seen
+        if seen <= SAMPLE_FIRST or random.random() < SAMPLE_RATE:
+            return False
+        self._suppressed[key] = self._suppressed.get(key, 0) + 1
+        return True
+
+    def _log(self, level: str, message: Message, extra: Extra = None, key: Optional[str] = None):
+        if LEVELS[level] < self.level or (key is not None and self._sampled_out(key)):
+            return
+        if callable(message):
+            message = message()
+        if callable(extra):
+            extra = extra()
+
+        if not self.buffered:
+            logger.log(_STDLIB_LEVELS[level], dumps(self._format_log(level, message, extra)))
+            return
+
+        entry = {'t_ms': round((time.time() - self._started) * 1000, 1), 'level': level, 'message': message}
+        if extra:
+            entry.update(extra)
+        self._buffer.append(entry)
+        # Errors go out right away in case the invocation dies before flushing
+        if level == 'ERROR' or len(self._buffer) >= MAX_BUFFERED_ENTRIES:
+            self.flush()
+
+    def debug(self, message: Message, extra: Extra = None, key: Optional[str] = None):
+        self._log('DEBUG', message, extra, key)
+
+    def info(self, message: Message, extra: Extra = None, key: Optional[str] = None):
+        self._log('INFO', message, extra, key)
+
+    def error(self, message: Message, error: Optional[Exception] = None, extra: Extra = None):
+        if isinstance(error, dict):  # called as error(message, extra)
+            error, extra = None, error
+        if not self.enabled('ERROR'):
+            return
+        error_data = (extra() if callable(extra) else extra) or {}
         if error:
             error_data.update({
                 'error_type': error.__class__.__name__,
                 'error_message': str(error),
                 'stacktrace': traceback.format_exc()
             })
-        log_entry = self._format_log('ERROR', message, error_data)
-        logger.error(json.dumps(log_entry))
-        
-    def warn(self, message: str, extra: Optional[Dict] = None):
-        log_entry = self._format_log('WARN', message, extra)
-        logger.warning(json.dumps(log_entry))
-
-def init_logger(function_name: str, event: Dict[str, Any]) -> LambdaLogger:
-    """Initialize a new logger for Lambda function use"""
-    return LambdaLogger(function_name, event)
\ No newline at end of file
+        self._log('ERROR', message, error_data)
+
+    def warn(self, message: Message, extra: Extra = None, key: Optional[str] = None):
+        self._log('WARN', message, extra, key)
+
+    def flush(self):
+        """
+        Emit buffered entries as one log line, plus counts of sampled-out
+        messages. Call once at the end of every invocation.
+        """
+        if self._buffer:
+            level = max((entry['level'] for entry in self._buffer), key=LEVELS.get)
+            log_data = self._format_log(level, f"{len(self._buffer)} buffered log entries",
+                                        {'entries': self._buffer})
+            if self._suppressed:
+                log_data['suppressed'] = self._suppressed
+            logger.log(_STDLIB_LEVELS[level], dumps(log_data))
+        elif self._suppressed and self.enabled('INFO'):
+            logger.info(dumps(self._format_log('INFO', 'Sampled log messages suppressed',
+                                               {'suppressed': self._suppressed})))
+        self._buffer = []
+        self._suppressed = {}
+
+def init_logger(function_name: str, event: Optional[Dict[str, Any]] = None,
+                buffered: bool = False) -> LambdaLogger:
+    """
+    Initialize a new logger for Lambda function use. Buffered loggers hold
+    entries and emit them as a single line on flush(), so they are only for
+    handlers that flush in a `finally`.
+    """
+    return LambdaLogger(function_name, event, buffered=buffered)
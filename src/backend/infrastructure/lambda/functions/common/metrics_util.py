@@ -0,0 +1,114 @@
+import functools
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from common.serialization import dumps
+
+# Phase timings and counters are collected per invocation and written as a
+# single CloudWatch Embedded Metric Format (EMF) line when the handler
+# returns, so every phase becomes a CloudWatch metric with no API calls.
+# A container runs one invocation at a time, so module state is safe.
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'Popcorn')
+
+# EMF accepts at most 100 values per metric per line
+MAX_VALUES_PER_METRIC = 100
+
+_invocation = {'function': None, 'durations': {}, 'counts': {}, 'properties': {}}
+
+def start_invocation(function_name: str) -> None:
+    _invocation.update(function=function_name, durations={}, counts={}, properties={})
+
+def record_duration(name: str, milliseconds: float) -> None:
+    values = _invocation['durations'].setdefault(name, [])
+    if len(values) < MAX_VALUES_PER_METRIC:
+        values.append(round(milliseconds, 2))
+
+def count(name: str, value: float = 1) -> None:
+    _invocation['counts'][name] = _invocation['counts'].get(name, 0) + value
+
+def set_property(name: str, value: Any) -> None:
+    """Searchable field on the metrics line that is not a metric (e.g. party_id)."""
+    _invocation['properties'][name] = value
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as the `name` phase (milliseconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_duration(name, (time.perf_counter() - start) * 1000)
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator form of span; the phase defaults to the function name."""
+    def decorator(func):
+        phase = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def emf_record(function_name: str, durations: Dict[str, List[float]], counts: Dict[str, float],
+               properties: Dict[str, Any]) -> Dict[str, Any]:
+    """One EMF log record with Function as the only dimension."""
+    metrics = [{'Name': name, 'Unit': 'Milliseconds'} for name in durations]
+    metrics += [{'Name': name, 'Unit': 'Count'} for name in counts]
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Function']],
+                'Metrics': metrics
+            }]
+        },
+        'Function': function_name
+    }
+    record.update(properties)
+    record.update(durations)
+    record.update(counts)
+    return record
+
+def emit() -> None:
+    """Write the invocation's metrics as one EMF line and reset them."""
+    if _invocation['function'] and (_invocation['durations'] or _invocation['counts']):
+        record = emf_record(_invocation['function'], _invocation['durations'],
+                            _invocation['counts'], _invocation['properties'])
+        # EMF lines must be bare JSON, so bypass the logging prefix
+        sys.stdout.write(dumps(record) + '\n')
+        sys.stdout.flush()
+    start_invocation(None)
+
+def instrumented(function_name: str) -> Callable:
+    """
+    Decorator for Lambda entry points: times the whole invocation as
+    `handler`, counts 5xx responses and unhandled exceptions as `errors`,
+    and emits the invocation's metrics when the handler returns.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            start_invocation(function_name)
+            request_id = getattr(context, 'aws_request_id', None)
+            if request_id:
+                set_property('request_id', request_id)
+            try:
+                with span('handler'):
+                    response = handler(event, context)
+                status = response.get('statusCode') if isinstance(response, dict) else None
+                if status is not None:
+                    set_property('status_code', status)
+                count('errors', 1 if status is not None and status >= 500 else 0)
+                return response
+            except Exception:
+                count('errors')
+                raise
+            finally:
+                emit()
+        return wrapper
+    return decorator
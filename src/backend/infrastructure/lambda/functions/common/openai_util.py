@@ -1,14 +1,14 @@
 import os
 import json
 from typing import List, Dict, Any
-import openai
-from openai import OpenAI
 from .logging_util import init_logger
 
 logger = init_logger('openai_util')
 
 class MovieRecommender:
     def __init__(self):
+        # Imported here so importing this module stays cheap on cold starts
+        from openai import OpenAI
         self.client = OpenAI(
             api_key=os.environ['OPENAI_API_KEY'],
             max_retries=2,  # Retry twice on failures
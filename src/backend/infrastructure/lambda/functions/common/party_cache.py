@@ -0,0 +1,79 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+from common.serialization import dumps
+
+# Parties (and their DynamoDB records) expire after 24 hours; cached
+# entries never need to outlive them
+PARTY_TTL_SECONDS = 86400
+
+def party_key(party_id: str) -> str:
+    return f"party:{party_id}"
+
+def preferences_key(party_id: str) -> str:
+    return f"preferences:{party_id}"
+
+def selected_movies_key(party_id: str) -> str:
+    return f"selected_movies:{party_id}"
+
+def set_party_state(redis_client, party_id: str, fields: Dict[str, Any]) -> None:
+    """Write real-time party state fields and refresh the key's TTL."""
+    key = party_key(party_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hmset(key, {k: str(v) for k, v in fields.items()})
+    pipe.expire(key, PARTY_TTL_SECONDS)
+    pipe.execute()
+
+def get_party_state(redis_client, party_id: str) -> Dict[str, str]:
+    return redis_client.hgetall(party_key(party_id))
+
+def get_preferences(redis_client, party_id: str,
+                    loader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Read-through access to the party's aggregated Suite 1 preferences.
+    On a miss `loader` is called (normally DynamoDB) and its result cached.
+    """
+    cached = redis_client.hgetall(preferences_key(party_id))
+    if cached:
+        return {field: json.loads(value) for field, value in cached.items()}
+
+    preferences = loader()
+    if preferences is not None:
+        set_preferences(redis_client, party_id, preferences)
+    return preferences
+
+def set_preferences(redis_client, party_id: str, preferences: Dict[str, Any]) -> None:
+    key = preferences_key(party_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(key)
+    pipe.hmset(key, {field: dumps(value) for field, value in preferences.items()})
+    pipe.expire(key, PARTY_TTL_SECONDS)
+    pipe.execute()
+
+def invalidate_preferences(redis_client, party_id: str) -> None:
+    """Drop cached preferences after a member submits or changes theirs."""
+    redis_client.delete(preferences_key(party_id))
+
+def get_selected_movies(redis_client, party_id: str,
+                        loader: Callable[[], Optional[List[Dict[str, Any]]]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Read-through access to the party's selected movies. On a miss `loader`
+    is called (normally the party record in DynamoDB) and its result cached.
+    """
+    cached = redis_client.lrange(selected_movies_key(party_id), 0, -1)
+    if cached:
+        return [json.loads(m) for m in cached]
+
+    movies = loader()
+    if movies:
+        set_selected_movies(redis_client, party_id, movies)
+    return movies
+
+def set_selected_movies(redis_client, party_id: str, movies: List[Dict[str, Any]]) -> None:
+    """Replace the cached selection; callers persist the same list to DynamoDB (write-through)."""
+    key = selected_movies_key(party_id)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(key)
+    if movies:
+        pipe.rpush(key, *[dumps(m) for m in movies])
+        pipe.expire(key, PARTY_TTL_SECONDS)
+    pipe.execute()
@@ -0,0 +1,71 @@
+from typing import Any, Dict, Optional
+from common.metrics_util import timed
+
+# Suite 1 fields folded into the party aggregate, one counter per chosen value
+AGGREGATE_FIELDS = ('genre_preferences', 'genre_dealbreakers', 'decade_preferences', 'year_cutoff')
+
+def aggregate_preference_id(party_id: str) -> str:
+    """
+    Key of the per-party Suite 1 aggregate record in the preferences table.
+
+    The record has no party_id attribute so it stays out of PartyIndex
+    and never shows up in per-member preference queries.
+    """
+    return f"{party_id}#aggregate#suite1"
+
+def counter_name(field: str, value: Any) -> str:
+    """Top-level attribute holding the number of members who chose `value` for `field`."""
+    return f"{field}:{value}"
+
+def preference_counts(preferences: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Counter increments contributed by one member's Suite 1 preferences."""
+    counts = {}
+    if not preferences:
+        return counts
+    for field in AGGREGATE_FIELDS:
+        values = preferences.get(field)
+        if values is None:
+            continue
+        if not isinstance(values, list):
+            values = [values]
+        for value in set(int(v) if field == 'year_cutoff' else v for v in values):
+            counts[counter_name(field, value)] = 1
+    return counts
+
+def preference_deltas(new_preferences: Dict[str, Any],
+                      old_preferences: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """Net counter changes when a member submits (or resubmits) Suite 1 preferences."""
+    deltas = preference_counts(new_preferences)
+    for name, count in preference_counts(old_preferences).items():
+        deltas[name] = deltas.get(name, 0) - count
+    return {name: delta for name, delta in deltas.items() if delta}
+
+def decode_aggregate(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn an aggregate record into the party preferences shape used by the
+    selection handlers, plus per-genre member counts in `genre_weights`.
+    """
+    counts = {field: {} for field in AGGREGATE_FIELDS}
+    for name, value in item.items():
+        field, sep, key = name.partition(':')
+        if sep and field in counts and value > 0:
+            counts[field][key] = int(value)
+
+    cutoffs = [int(c) for c in counts['year_cutoff']]
+    return {
+        'genre_preferences': list(counts['genre_preferences']),
+        'genre_dealbreakers': list(counts['genre_dealbreakers']),
+        'decade_preferences': list(counts['decade_preferences']),
+        'year_cutoff': max(cutoffs) if cutoffs else None,
+        'genre_weights': counts['genre_preferences'],
+        'member_count': int(item.get('member_count', 0))
+    }
+
+@timed('preference_aggregate_read')
+def get_party_aggregate(preferences_table, party_id: str) -> Optional[Dict[str, Any]]:
+    """Read the precomputed Suite 1 aggregate for a party, or None if it has not been built."""
+    response = preferences_table.get_item(Key={'preference_id': aggregate_preference_id(party_id)})
+    item = response.get('Item')
+    if not item or not item.get('member_count'):
+        return None
+    return decode_aggregate(item)
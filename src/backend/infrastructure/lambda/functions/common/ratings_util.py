@@ -0,0 +1,26 @@
+from typing import Any, Dict, List, Union
+
+# Suite 2 preference records live as long as the party (24 hours)
+RATINGS_TTL_SECONDS = 86400
+
+def ratings_map(movie_ratings: Union[Dict[str, Any], List[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """
+    Normalize a suite2 `movie_ratings` attribute to {movie_id: rating}.
+
+    Records written before the map layout stored a list of
+    {'movie_id', 'rating'} entries; both layouts are accepted so readers
+    keep working while old records are migrated.
+    """
+    if not movie_ratings:
+        return {}
+    if isinstance(movie_ratings, dict):
+        return dict(movie_ratings)
+    return {r['movie_id']: r['rating'] for r in movie_ratings if 'movie_id' in r}
+
+def get_movie_ratings(preference_item: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the {movie_id: rating} map from a suite2 preference record."""
+    return ratings_map(preference_item.get('preferences', {}).get('movie_ratings'))
+
+def is_legacy_ratings(preference_item: Dict[str, Any]) -> bool:
+    """True if the record still stores its ratings in the old list layout."""
+    return isinstance(preference_item.get('preferences', {}).get('movie_ratings'), list)
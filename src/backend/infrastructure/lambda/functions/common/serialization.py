@@ -0,0 +1,36 @@
+import json
+from decimal import Decimal
+from typing import Any
+
+# DynamoDB (boto3 resource API) returns every number as a Decimal and
+# every set as a Python set, neither of which json can encode. Handlers
+# serialize items straight from DynamoDB with `dumps` and only call
+# `to_native` when they need plain numbers in Python (e.g. for prompts).
+
+def native_number(value: Decimal):
+    """int for integral Decimals (years, counts, ids), float otherwise."""
+    return int(value) if value == value.to_integral_value() else float(value)
+
+def json_default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return native_number(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Response bodies are only ever parsed, so skip the whitespace
+_encoder = json.JSONEncoder(default=json_default, separators=(',', ':'))
+
+def dumps(obj: Any) -> str:
+    """JSON-encode a DynamoDB item/payload in one pass, without converting it first."""
+    return _encoder.encode(obj)
+
+def to_native(obj: Any) -> Any:
+    """Copy of `obj` with Decimals as int/float and sets as lists, in a single pass."""
+    if isinstance(obj, dict):
+        return {key: to_native(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [to_native(value) for value in obj]
+    if isinstance(obj, Decimal):
+        return native_number(obj)
+    return obj
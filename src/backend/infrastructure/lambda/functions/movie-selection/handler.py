@@ -1,17 +1,21 @@
 import json
-import boto3
 import redis
 import os
 from datetime import datetime
 from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+from typing import Dict, Any
 from common.logging_util import init_logger
+from common import clients, party_cache
+from common.ratings_util import get_movie_ratings
+from common.preferences_util import get_party_aggregate
+from common.catalog_util import scan_selection, get_movies
+from common.serialization import dumps
+from common.metrics_util import instrumented, span
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = clients.dynamodb()
 preferences_table = dynamodb.Table(os.environ['PREFERENCES_TABLE_NAME'])
 party_table = dynamodb.Table(os.environ['PARTY_TABLE_NAME'])
-movies_table = dynamodb.Table(os.environ['MOVIES_TABLE_NAME'])
 
 # Initialize Redis client
 redis_client = redis.Redis(
@@ -20,17 +24,63 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
+def load_party_preferences(party_id: str) -> Dict[str, Any]:
+    """
+    Load the party's aggregated Suite 1 preferences from DynamoDB.
+    """
+    # Read the party aggregate maintained by suite1-preferences
+    aggregate = get_party_aggregate(preferences_table, party_id)
+    if aggregate:
+        return aggregate
+
+    # Parties created before the aggregate existed: union member records
+    preferences_response = preferences_table.query(
+        IndexName='PartyIndex',
+        KeyConditionExpression=Key('party_id').eq(party_id),
+        FilterExpression='suite_number = :suite_num',
+        ExpressionAttributeValues={
+            ':suite_num': 1
+        }
+    )
+
+    # Aggregate preferences
+    genre_preferences = set()
+    genre_dealbreakers = set()
+    decade_preferences = set()
+    year_cutoff = None
+    genre_weights = {}
 
+    for pref in preferences_response['Items']:
+        prefs = pref['preferences']
+        # Add genre preferences
+        genre_preferences.update(prefs.get('genre_preferences', []))
+        for genre in prefs.get('genre_preferences', []):
+            genre_weights[genre] = genre_weights.get(genre, 0) + 1
+        # Add dealbreakers (only need one person to veto)
+        genre_dealbreakers.update(prefs.get('genre_dealbreakers', []))
+        # Add decade preferences
+        decade_preferences.update(prefs.get('decade_preferences', []))
+        # Get most restrictive year cutoff
+        user_cutoff = prefs.get('year_cutoff')
+        if user_cutoff and (not year_cutoff or user_cutoff > year_cutoff):
+            year_cutoff = int(user_cutoff)
+
+    return {
+        'genre_preferences': list(genre_preferences),
+        'genre_dealbreakers': list(genre_dealbreakers),
+        'decade_preferences': list(decade_preferences),
+        'year_cutoff': year_cutoff,
+        'genre_weights': genre_weights,
+        'member_count': len(preferences_response['Items'])
+    }
+
+@instrumented('select_movies')
 def select_movies(event, context):
     """
     Select movies for Suite 3 based on party preferences
     """
 
-    logger = init_logger('select_movies', event)
+    logger = init_logger('select_movies', event, buffered=True)
 
     try:
         party_id = event['pathParameters']['party_id']
@@ -48,39 +98,17 @@ def select_movies(event, context):
         party = party_response['Item']
         streaming_services = party['streaming_services']
         
-        # Get all preferences from party members
-        preferences_response = preferences_table.query(
-            IndexName='PartyIndex',
-            KeyConditionExpression=Key('party_id').eq(party_id)
-        )
-        
-        # Aggregate preferences
-        genre_preferences = set()
-        genre_dealbreakers = set()
-        decade_preferences = set()
-        year_cutoff = None
-
-        for pref in preferences_response['Items']:
-            prefs = pref['preferences']
-            # Add genre preferences
-            genre_preferences.update(prefs.get('genre_preferences', []))
-            # Add dealbreakers (only need one person to veto)
-            genre_dealbreakers.update(prefs.get('genre_dealbreakers', []))
-            # Add decade preferences
-            decade_preferences.update(prefs.get('decade_preferences', []))
-            # Get most restrictive year cutoff
-            user_cutoff = prefs.get('year_cutoff')
-            if user_cutoff and (not year_cutoff or user_cutoff > year_cutoff):
-                year_cutoff = user_cutoff
-        
-        # Cache these preferences in Redis for quick access
-        redis_key = f"preferences:{party_id}"
-        redis_client.hmset(redis_key, {
-            'genre_preferences': json.dumps(list(genre_preferences)),
-            'genre_dealbreakers': json.dumps(list(genre_dealbreakers)),
-            'decade_preferences': json.dumps(list(decade_preferences)),
-            'year_cutoff': str(year_cutoff) if year_cutoff else ''
-        })
+        # Party preferences: Redis first, then the DynamoDB aggregate
+        with span('party_preferences'):
+            preferences = party_cache.get_preferences(
+                redis_client, party_id, lambda: load_party_preferences(party_id)
+            )
+        genre_preferences = set(preferences['genre_preferences'])
+        genre_dealbreakers = set(preferences['genre_dealbreakers'])
+        decade_preferences = set(preferences['decade_preferences'])
+        year_cutoff = preferences['year_cutoff']
+        genre_weights = preferences['genre_weights']
+        member_count = preferences['member_count']
         
         logger.info('Aggregated party preferences', {
             'party_id': party_id,
@@ -91,44 +119,42 @@ def select_movies(event, context):
         })
         
         # Get Suite 2 ratings for this party
-        suite2_preferences = preferences_table.query(
-            IndexName='PartyIndex',
-            KeyConditionExpression=Key('party_id').eq(party_id),
-            FilterExpression='suite_number = :suite_num',
-            ExpressionAttributeValues={
-                ':suite_num': 2
-            }
-        )
+        with span('suite2_ratings'):
+            suite2_preferences = preferences_table.query(
+                IndexName='PartyIndex',
+                KeyConditionExpression=Key('party_id').eq(party_id),
+                FilterExpression='suite_number = :suite_num',
+                ExpressionAttributeValues={
+                    ':suite_num': 2
+                }
+            )
         
         # Calculate average ratings per movie
         movie_ratings = {}
         for pref in suite2_preferences.get('Items', []):
-            if 'movie_ratings' in pref.get('preferences', {}):
-                for rating in pref['preferences']['movie_ratings']:
-                    movie_id = rating['movie_id']
-                    if movie_id not in movie_ratings:
-                        movie_ratings[movie_id] = {'total': 0, 'count': 0}
-                    movie_ratings[movie_id]['total'] += rating['rating']
-                    movie_ratings[movie_id]['count'] += 1
+            for movie_id, rating in get_movie_ratings(pref).items():
+                if movie_id not in movie_ratings:
+                    movie_ratings[movie_id] = {'total': 0, 'count': 0}
+                movie_ratings[movie_id]['total'] += rating
+                movie_ratings[movie_id]['count'] += 1
         
         logger.info('Processed Suite 2 ratings', {
             'party_id': party_id,
             'num_rated_movies': len(movie_ratings)
         })
 
-        # Define scan parameters
-        scan_kwargs = {
-            'FilterExpression': 'size(streaming_platforms) > :zero',
-            'ExpressionAttributeValues': {':zero': 0}
-        }
-
         # Modify the movie selection logic to include ratings
         selected_movies = []
         rated_movies = []
         unrated_movies = []
         
-        response = movies_table.scan(**scan_kwargs)
-        for movie in response['Items']:
+        # Filter on the lightweight selection view; full items are only
+        # loaded for the movies that get selected
+        for movie in scan_selection(dynamodb):
+            # Skip if movie isn't streaming anywhere
+            if not movie['platforms']:
+                continue
+            
             # Skip if movie is in dealbreaker genre
             if any(genre in movie['genres'] for genre in genre_dealbreakers):
                 continue
@@ -138,13 +164,14 @@ def select_movies(event, context):
                 continue
                 
             # Skip if movie isn't available on party's streaming services
-            movie_platforms = {p['platform'] for p in movie['streaming_platforms']}
-            if not any(service in movie_platforms for service in streaming_services):
+            if not any(service in movie['platforms'] for service in streaming_services):
                 continue
                 
-            # Calculate base match score
+            # Calculate base match score; genre match is worth up to 2 points,
+            # scaled by how many members chose the movie's genres
+            genre_votes = sum(genre_weights.get(genre, 0) for genre in movie['genres'])
             match_score = sum([
-                any(genre in movie['genres'] for genre in genre_preferences) * 2,  # Genre match worth 2 points
+                2 * min(1, genre_votes / member_count) if member_count else 0,
                 str(movie['year'])[:3] + '0' in decade_preferences  # Decade match worth 1 point
             ])
             
@@ -162,10 +189,20 @@ def select_movies(event, context):
         unrated_movies.sort(key=lambda x: x[1], reverse=True)
         
         # Combine lists, prioritizing rated movies
-        selected_movies = [m[0] for m in rated_movies[:3]]  # Take top 3 rated movies
-        remaining_slots = 5 - len(selected_movies)
+        selected_ids = [m[0]['movie_id'] for m in rated_movies[:3]]  # Take top 3 rated movies
+        remaining_slots = 5 - len(selected_ids)
         if remaining_slots > 0:
-            selected_movies.extend([m[0] for m in unrated_movies[:remaining_slots]])  # Fill remaining slots
+            selected_ids.extend([m[0]['movie_id'] for m in unrated_movies[:remaining_slots]])  # Fill remaining slots
+        selected_movies = get_movies(dynamodb, selected_ids)
+        
+        # Write-through: persist the selection on the party, then cache it
+        with span('party_write'):
+            party_table.update_item(
+                Key={'party_id': party_id},
+                UpdateExpression='SET selected_movies = :movies',
+                ExpressionAttributeValues={':movies': selected_movies}
+            )
+            party_cache.set_selected_movies(redis_client, party_id, selected_movies)
         
         logger.info('Movies selected successfully', {
             'party_id': party_id,
@@ -180,10 +217,10 @@ def select_movies(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Credentials': True
             },
-            'body': json.dumps({
+            'body': dumps({
                 'party_id': party_id,
                 'selected_movies': selected_movies
-            }, default=decimal_default)
+            })
         }
         
     except Exception as e:
@@ -194,7 +231,10 @@ def select_movies(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': 'Could not select movies'})
         }
+    finally:
+        logger.flush()
 
+@instrumented('get_selected_movies')
 def get_selected_movies(event, context):
     """
     Get the previously selected movies for a party
@@ -207,19 +247,23 @@ def get_selected_movies(event, context):
 
         logger.info('Getting selected movies', {'party_id': party_id})
         
-        # Try to get from Redis first
-        movies_key = f"selected_movies:{party_id}"
-        cached_movies = redis_client.lrange(movies_key, 0, -1)
+        # Try Redis first, falling back to the selection stored on the party
+        def load_selected_movies():
+            response = party_table.get_item(
+                Key={'party_id': party_id},
+                ProjectionExpression='selected_movies'
+            )
+            return response.get('Item', {}).get('selected_movies')
+
+        movies = party_cache.get_selected_movies(redis_client, party_id, load_selected_movies)
         
-        if cached_movies:
-            movies = [json.loads(m) for m in cached_movies]
-            logger.info('Found cached movie selections', {
+        if movies:
+            logger.info('Found movie selections', {
                 'party_id': party_id,
                 'num_movies': len(movies)
             })
         else:
-            logger.warn('No cached movies found', {'party_id': party_id})
-            # If not in Redis, return error as selections should be cached
+            logger.warn('No selected movies found', {'party_id': party_id})
             return {
                 'statusCode': 404,
                 'body': json.dumps({'error': 'No movies selected for this party'})
@@ -231,10 +275,10 @@ def get_selected_movies(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Credentials': True
             },
-            'body': json.dumps({
+            'body': dumps({
                 'party_id': party_id,
                 'selected_movies': movies
-            }, default=decimal_default)
+            })
         }
         
     except Exception as e:
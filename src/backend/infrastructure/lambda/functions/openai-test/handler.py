@@ -1,24 +1,22 @@
 import os
 import json
-import boto3
 import random
 from botocore.exceptions import ClientError
-from openai import OpenAI
-from decimal import Decimal
+from common import clients
 from common.logging_util import init_logger
+from common.serialization import dumps
+from common.metrics_util import instrumented
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-secretsmanager = boto3.client('secretsmanager', region_name='us-east-1')
+dynamodb = clients.dynamodb()
 
-def get_openai_api_key(logger):
-    """Retrieve OpenAI API key from Secrets Manager."""
+def get_openai_client(logger):
+    """
+    OpenAI client; openai is only imported, and the key only fetched from
+    Secrets Manager, the first time a container calls the model.
+    """
     try:
-        secret_name = "popcorn/openai"
-        logger.info(f"Fetching secret: {secret_name}")
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
-        logger.info("Successfully fetched secret")
-        return response['SecretString']
+        return clients.openai_client(timeout=120.0)
     except ClientError as e:
         logger.error(f"Error getting secret: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
@@ -57,10 +55,7 @@ def generate_alternate_summary(movie_title, original_summary, logger):
     """Generate an alternative plot summary using OpenAI."""
     try:
         logger.info("Getting OpenAI API key")
-        client = OpenAI(
-            api_key=get_openai_api_key(logger),
-            timeout=120.0  # Increased from 3.0
-        )
+        client = get_openai_client(logger)
         
         logger.info("Creating OpenAI prompt")
         prompt = f"""Given the movie "{movie_title}", rewrite this plot summary in a different style:
@@ -84,8 +79,10 @@ def generate_alternate_summary(movie_title, original_summary, logger):
         return response.choices[0].message.content.strip()
     except Exception as e:
         logger.error(f"Error calling OpenAI API: {str(e)}")
+        clients.reset_openai_key_on_auth_error(e)
         raise
 
+@instrumented('openai-test')
 def lambda_handler(event, context):
     """Main Lambda handler."""
     logger = init_logger('openai-test', event)
@@ -102,12 +99,9 @@ def lambda_handler(event, context):
         )
         logger.info("Generated alternate summary successfully")
         
-        # Handle Decimal serialization
-        movie = json.loads(json.dumps(movie, default=str))
-        
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': dumps({
                 'movie': movie,
                 'alternate_summary': alternate_summary,
                 'message': 'Successfully generated alternate summary'
@@ -1,14 +1,15 @@
 import json
-import boto3
 import redis
 import os
 import uuid
 from datetime import datetime, timedelta
-from decimal import Decimal
 from common.logging_util import init_logger
+from common import clients, party_cache
+from common.serialization import dumps
+from common.metrics_util import instrumented
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = clients.dynamodb()
 party_table = dynamodb.Table(os.environ['PARTY_TABLE_NAME'])
 user_table = dynamodb.Table(os.environ['USER_TABLE_NAME'])
 
@@ -19,12 +20,7 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
-# Add this helper function at the top of the file
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
-
+@instrumented('create_party')
 def create_party(event, context):
     """
     Create a new viewing party/lobby
@@ -66,13 +62,11 @@ def create_party(event, context):
         party_table.put_item(Item=party_item)
         
         # Add to Redis for real-time access
-        redis_key = f"party:{party_id}"
-        redis_client.hmset(redis_key, {
+        party_cache.set_party_state(redis_client, party_id, {
             'host_id': host_id,
             'status': 'lobby',
             'current_suite': '1'
         })
-        redis_client.expire(redis_key, 86400)  # 24 hours TTL
         
         logger.info('Party created successfully', {
             'party_id': party_id,
@@ -106,6 +100,7 @@ def create_party(event, context):
             })
         }
 
+@instrumented('join_party')
 def join_party(event, context):
     """
     Join an existing party/lobby
@@ -155,8 +150,7 @@ def join_party(event, context):
         party_table.put_item(Item=party)
         
         # Update Redis
-        redis_key = f"party:{party_id}"
-        redis_client.hset(redis_key, f"user:{user_id}", 'active')
+        party_cache.set_party_state(redis_client, party_id, {f"user:{user_id}": 'active'})
         
         logger.info('User joined party successfully', {
             'party_id': party_id,
@@ -185,6 +179,7 @@ def join_party(event, context):
         }
 
 # Then in get_party_status, update the return statement to use this serializer
+@instrumented('get_party_status')
 def get_party_status(event, context):
 
     # initialize logger
@@ -223,8 +218,7 @@ def get_party_status(event, context):
         party = party_response['Item']
         
         # Check Redis for real-time status
-        redis_key = f"party:{party_id}"
-        redis_status = redis_client.hgetall(redis_key)
+        redis_status = party_cache.get_party_state(redis_client, party_id)
         
         # Merge Redis status if available
         if redis_status:
@@ -254,7 +248,7 @@ def get_party_status(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Credentials': True
             },
-            'body': json.dumps(response_data, default=decimal_default)
+            'body': dumps(response_data)
         }
         
     except Exception as e:
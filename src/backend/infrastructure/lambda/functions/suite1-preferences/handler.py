@@ -1,26 +1,27 @@
 import json
 import os
-import boto3
+import redis
 import uuid
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from common.preferences_util import aggregate_preference_id, preference_counts, preference_deltas
+from common import clients, party_cache
+from common.logging_util import init_logger
+from common.metrics_util import instrumented
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = clients.dynamodb()
 preferences_table = dynamodb.Table(os.environ['PREFERENCES_TABLE_NAME'])
 
-def init_logger(handler_name: str, event: Dict = None) -> Any:
-    """Initialize logger with context."""
-    # Placeholder for logging util - would normally import from common
-    class SimpleLogger:
-        def error(self, msg, error=None, context=None):
-            print(f"ERROR: {msg}")
-            if error:
-                print(f"Error details: {str(error)}")
-        def info(self, msg, context=None):
-            print(f"INFO: {msg}")
-    return SimpleLogger()
+# Initialize Redis client
+redis_client = redis.Redis(
+    host=os.environ['REDIS_HOST'],
+    port=6379,
+    decode_responses=True
+)
 
 logger = init_logger('suite1_preferences')
 
@@ -59,6 +60,71 @@ def validate_preferences(preferences: Dict[str, Any]) -> bool:
         logger.error(f"Error validating preferences: {str(e)}")
         return False
 
+# Retries when another submission lands between our reads and the
+# transactional write
+MAX_WRITE_ATTEMPTS = 3
+
+# TransactWriteItems limit; seeding an aggregate touches every member record
+MAX_TRANSACT_ITEMS = 100
+
+_serializer = TypeSerializer()
+
+def _serialize(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: _serializer.serialize(value) for key, value in values.items()}
+
+def aggregate_exists(party_id: str) -> bool:
+    response = preferences_table.get_item(
+        Key={'preference_id': aggregate_preference_id(party_id)},
+        ProjectionExpression='member_count',
+        ConsistentRead=True
+    )
+    return 'member_count' in response.get('Item', {})
+
+def other_member_records(party_id: str, preference_id: str) -> List[Dict[str, Any]]:
+    """Suite 1 records of every other member of the party, via PartyIndex."""
+    query_kwargs = {
+        'IndexName': 'PartyIndex',
+        'KeyConditionExpression': 'party_id = :pid',
+        'FilterExpression': 'suite_number = :suite_num',
+        'ProjectionExpression': 'preference_id, preferences, version',
+        'ExpressionAttributeValues': {':pid': party_id, ':suite_num': 1}
+    }
+    items = []
+    while True:
+        response = preferences_table.query(**query_kwargs)
+        items.extend(item for item in response['Items'] if item['preference_id'] != preference_id)
+        if 'LastEvaluatedKey' not in response:
+            return items
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def seed_transact_items(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Pin the member records an aggregate is seeded from: unversioned ones are
+    stamped with version 1 (so a later resubmission subtracts them), the
+    rest must still be at the version that was read.
+    """
+    transact_items = []
+    for record in records:
+        key = _serialize({'preference_id': record['preference_id']})
+        if 'version' in record:
+            transact_items.append({'ConditionCheck': {
+                'TableName': preferences_table.name,
+                'Key': key,
+                'ConditionExpression': '#v = :v',
+                'ExpressionAttributeNames': {'#v': 'version'},
+                'ExpressionAttributeValues': _serialize({':v': record['version']})
+            }})
+        else:
+            transact_items.append({'Update': {
+                'TableName': preferences_table.name,
+                'Key': key,
+                'UpdateExpression': 'SET #v = :v',
+                'ConditionExpression': 'attribute_exists(preference_id) AND attribute_not_exists(#v)',
+                'ExpressionAttributeNames': {'#v': 'version'},
+                'ExpressionAttributeValues': _serialize({':v': 1})
+            }})
+    return transact_items
+
 def store_preferences(
     party_id: str,
     user_id: str,
@@ -66,31 +132,140 @@ def store_preferences(
 ) -> Dict[str, Any]:
     """
     Stores the validated preferences in DynamoDB.
+
+    The member record and the party aggregate are written in one
+    TransactWriteItems, so the aggregate can never miss or double count a
+    submission. Only versioned member records have been folded into the
+    aggregate; an unversioned (pre-aggregate) record is added as a new
+    member rather than subtracted. If the party has no aggregate yet, it
+    is seeded from every other member's record in the same transaction.
+    Each record's `version` is checked on write; if another submission got
+    in first, everything is re-read and recomputed.
     """
-    timestamp = int(datetime.now().timestamp())
-    
-    preference_item = {
-        'preference_id': f"{party_id}#{user_id}#suite1",
-        'party_id': party_id,
-        'user_id': user_id,
-        'suite_number': 1,
-        'preferences': {
-            'genre_preferences': preferences['genre_preferences'],
-            'genre_dealbreakers': preferences['genre_dealbreakers'],
-            'decade_preferences': preferences['decade_preferences'],
-            'year_cutoff': preferences['year_cutoff']
-        },
-        'timestamp': timestamp,
-        'expires_at': timestamp + 86400  # 24 hour TTL
-    }
-    
+    preference_id = f"{party_id}#{user_id}#suite1"
+
     try:
-        preferences_table.put_item(Item=preference_item)
-        return preference_item
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            existing = preferences_table.get_item(
+                Key={'preference_id': preference_id},
+                ProjectionExpression='preferences, version',
+                ConsistentRead=True
+            ).get('Item')
+            seeding = not aggregate_exists(party_id)
+            seed_records = other_member_records(party_id, preference_id) if seeding else []
+
+            timestamp = int(datetime.now().timestamp())
+            preference_item = {
+                'preference_id': preference_id,
+                'party_id': party_id,
+                'user_id': user_id,
+                'suite_number': 1,
+                'preferences': {
+                    'genre_preferences': preferences['genre_preferences'],
+                    'genre_dealbreakers': preferences['genre_dealbreakers'],
+                    'decade_preferences': preferences['decade_preferences'],
+                    'year_cutoff': preferences['year_cutoff']
+                },
+                'version': int(existing.get('version', 0)) + 1 if existing else 1,
+                'timestamp': timestamp,
+                'expires_at': timestamp + 86400  # 24 hour TTL
+            }
+
+            if existing is None:
+                put = {'ConditionExpression': 'attribute_not_exists(preference_id)'}
+            elif 'version' in existing:
+                put = {
+                    'ConditionExpression': '#v = :prev_version',
+                    'ExpressionAttributeNames': {'#v': 'version'},
+                    'ExpressionAttributeValues': _serialize({':prev_version': existing['version']})
+                }
+            else:
+                # Written before records were versioned
+                put = {
+                    'ConditionExpression': 'attribute_exists(preference_id) AND attribute_not_exists(#v)',
+                    'ExpressionAttributeNames': {'#v': 'version'}
+                }
+            put.update(TableName=preferences_table.name, Item=_serialize(preference_item))
+
+            # The previous submission is only in the aggregate if it was
+            # versioned and the aggregate has not been (re)created since
+            folded = existing if existing and 'version' in existing and not seeding else None
+            old_preferences = folded['preferences'] if folded else None
+            deltas = preference_deltas(preference_item['preferences'], old_preferences)
+            if folded is None:
+                deltas['member_count'] = 1
+            for record in seed_records:
+                for name, increment in preference_counts(record.get('preferences')).items():
+                    deltas[name] = deltas.get(name, 0) + increment
+            if seed_records:
+                deltas['member_count'] += len(seed_records)
+
+            transact_items = [{'Put': put}] + seed_transact_items(seed_records)
+            aggregate_update = party_aggregate_update(party_id, deltas, timestamp, seeding)
+            if aggregate_update:
+                transact_items.append({'Update': aggregate_update})
+            if len(transact_items) > MAX_TRANSACT_ITEMS:
+                raise ValueError(f'Party {party_id} has too many members to seed its preference aggregate')
+
+            try:
+                dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'TransactionCanceledException':
+                    raise
+                reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+                if not {'ConditionalCheckFailed', 'TransactionConflict'} & set(reasons):
+                    raise
+                logger.warn('Concurrent preference submission, retrying', {
+                    'preference_id': preference_id,
+                    'attempt': attempt + 1
+                })
+                continue
+
+            party_cache.invalidate_preferences(redis_client, party_id)
+            return preference_item
+
+        raise Exception('Could not store preferences after concurrent updates')
     except Exception as e:
         logger.error(f"Error storing preferences: {str(e)}")
         raise
 
+def party_aggregate_update(
+    party_id: str,
+    deltas: Dict[str, int],
+    timestamp: int,
+    seeding: bool
+) -> Optional[Dict[str, Any]]:
+    """
+    Transactional Update that applies counter deltas to the party's Suite 1
+    aggregate record, or None if nothing changes. Each chosen value is its
+    own counter, so concurrent submissions from different members are
+    applied with a single atomic ADD. The write is conditioned on the
+    aggregate being absent when seeding it and present otherwise, so a
+    seed never races another seed or an expiry.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return None
+
+    names = {'#members': 'member_count'}
+    # Expire with the newest member record, never before a folded one
+    values = {':expires_at': timestamp + 86400}
+    add_clauses = []
+    for i, (name, delta) in enumerate(deltas.items()):
+        names[f'#c{i}'] = name
+        values[f':d{i}'] = delta
+        add_clauses.append(f'#c{i} :d{i}')
+
+    return {
+        'TableName': preferences_table.name,
+        'Key': _serialize({'preference_id': aggregate_preference_id(party_id)}),
+        'UpdateExpression': 'SET expires_at = :expires_at ADD ' + ', '.join(add_clauses),
+        'ConditionExpression': 'attribute_not_exists(#members)' if seeding else 'attribute_exists(#members)',
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': _serialize(values)
+    }
+
+@instrumented('suite1_preferences')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for storing Suite 1 preferences.
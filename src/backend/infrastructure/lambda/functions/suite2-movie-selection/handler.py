@@ -1,38 +1,49 @@
 import os
 import json
-import boto3
 import random
 from typing import List, Dict, Any
 from botocore.exceptions import ClientError
-from openai import OpenAI
-from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
+from common import clients
 from common.logging_util import init_logger
+from common.preferences_util import get_party_aggregate
+from common.catalog_util import scan_selection, get_movies
+from common.serialization import dumps
+from common.metrics_util import instrumented, span, timed, count
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-secretsmanager = boto3.client('secretsmanager', region_name='us-east-1')
+dynamodb = clients.dynamodb()
 
-def get_openai_api_key(logger):
-    """Retrieve OpenAI API key from Secrets Manager."""
+# Most relevant matches offered to the model; only these are loaded in full
+MAX_CANDIDATES = 100
+
+@timed('openai_client')
+def get_openai_client(logger):
+    """
+    OpenAI client; openai is only imported, and the key only fetched from
+    Secrets Manager, the first time a container calls the model.
+    """
     try:
-        secret_name = "popcorn/openai"
-        logger.info(f"Fetching OpenAI API key from Secrets Manager: {secret_name}")
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
-        logger.info("Successfully retrieved OpenAI API key from Secrets Manager")
-        return response['SecretString']
+        return clients.openai_client(timeout=120.0)
     except ClientError as e:
         logger.error(f"Failed to get OpenAI API key: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
         logger.error(f"Error code: {e.response['Error']['Code'] if 'Error' in e.response else 'No error code'}")
         raise
 
+@timed('party_preferences')
 def get_party_preferences(party_id: str, logger) -> Dict[str, Any]:
     """Get Suite 1 preferences for the party from DynamoDB."""
     try:
         logger.info(f"Getting Suite 1 preferences for party: {party_id}")
         preferences_table = dynamodb.Table(os.environ['PREFERENCES_TABLE_NAME'])
         
+        # Prefer the aggregate folded in by suite1-preferences at write time
+        aggregate = get_party_aggregate(preferences_table, party_id)
+        if aggregate:
+            logger.info(f"Using precomputed preference aggregate for {aggregate['member_count']} members")
+            return aggregate
+        
         # Query preferences using GSI
         logger.info("Querying preferences table using PartyIndex GSI")
         response = preferences_table.query(
@@ -52,25 +63,30 @@ def get_party_preferences(party_id: str, logger) -> Dict[str, Any]:
         genre_dealbreakers = set()
         decade_preferences = set()
         year_cutoff = None
+        genre_weights = {}
         
         for pref in response['Items']:
             prefs = pref.get('preferences', {})
             user_id = pref.get('user_id', 'unknown')
-            logger.info(f"Processing preferences for user: {user_id}")
             
-            # Log individual user preferences
+            # Log individual user preferences (sampled; parties can be large)
             user_genres = prefs.get('genre_preferences', [])
             user_dealbreakers = prefs.get('genre_dealbreakers', [])
-            logger.info(f"User {user_id} preferences - Genres: {user_genres}, Dealbreakers: {user_dealbreakers}")
+            logger.debug("Member preferences", {
+                'user_id': user_id,
+                'genres': user_genres,
+                'dealbreakers': user_dealbreakers
+            }, key='member_preferences')
             
             genre_preferences.update(user_genres)
+            for genre in user_genres:
+                genre_weights[genre] = genre_weights.get(genre, 0) + 1
             genre_dealbreakers.update(user_dealbreakers)
             decade_preferences.update(prefs.get('decade_preferences', []))
             
             # Take the most restrictive year cutoff
             user_cutoff = prefs.get('year_cutoff')
             if user_cutoff:
-                logger.info(f"User {user_id} year cutoff: {user_cutoff}")
                 if not year_cutoff or user_cutoff > year_cutoff:
                     year_cutoff = user_cutoff
         
@@ -78,7 +94,9 @@ def get_party_preferences(party_id: str, logger) -> Dict[str, Any]:
             'genre_preferences': list(genre_preferences),
             'genre_dealbreakers': list(genre_dealbreakers),
             'decade_preferences': list(decade_preferences),
-            'year_cutoff': year_cutoff
+            'year_cutoff': year_cutoff,
+            'genre_weights': genre_weights,
+            'member_count': len(response['Items'])
         }
         
         logger.info("Aggregated party preferences:")
@@ -93,33 +111,20 @@ def get_party_preferences(party_id: str, logger) -> Dict[str, Any]:
         logger.error(f"Error type: {type(e).__name__}")
         raise
 
+@timed('get_matching_movies')
 def get_matching_movies(preferences: Dict[str, Any], logger) -> List[Dict[str, Any]]:
     """Get movies that match ALL party preferences."""
     try:
         logger.info("Starting movie matching process")
-        movies_table = dynamodb.Table(os.environ['MOVIES_TABLE_NAME'])
         matching_movies = []
         
-        # Start with scan since we need to check multiple conditions
-        logger.info("Scanning movies table for matches")
-        response = movies_table.scan()
-        movies = response['Items']
-        
-        # Add pagination support for large datasets
-        while 'LastEvaluatedKey' in response:
-            logger.info("Fetching additional page of movies")
-            response = movies_table.scan(
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            movies.extend(response['Items'])
+        # Scan the lightweight selection view since we need to check multiple conditions
+        logger.info("Scanning movie catalog for matches")
+        movies = scan_selection(dynamodb)
         
         logger.info(f"Retrieved {len(movies)} total movies to process")
         
         for movie in movies:
-            # Log every 100 movies processed
-            if len(matching_movies) % 100 == 0:
-                logger.info(f"Processed {len(matching_movies)} matching movies so far")
-            
             # Check year cutoff
             if preferences['year_cutoff'] and movie['year'] < preferences['year_cutoff']:
                 continue
@@ -142,7 +147,17 @@ def get_matching_movies(preferences: Dict[str, Any], logger) -> List[Dict[str, A
             
             matching_movies.append(movie)
         
+        # Put movies in the genres most members asked for first
+        genre_weights = preferences.get('genre_weights', {})
+        matching_movies.sort(key=lambda m: sum(genre_weights.get(g, 0) for g in m['genres']), reverse=True)
+        
+        count('movies_matched', len(matching_movies))
         logger.info(f"Found {len(matching_movies)} total matching movies")
+        
+        # Only the most relevant candidates go into the prompt, so only
+        # load full items (titles etc.) for those
+        matching_movies = get_movies(dynamodb, [m['movie_id'] for m in matching_movies[:MAX_CANDIDATES]])
+        logger.info(f"Selected top {len(matching_movies)} most relevant movies")
         logger.info("Sample of matched movies:")
         for movie in matching_movies[:5]:
             logger.info(f"- {movie['title']} ({movie['year']})")
@@ -153,20 +168,15 @@ def get_matching_movies(preferences: Dict[str, Any], logger) -> List[Dict[str, A
         logger.error(f"Error type: {type(e).__name__}")
         raise
 
+@timed('get_random_movies')
 def get_random_movies(count: int, logger) -> List[Dict[str, Any]]:
     """Get a random selection of movies from the database."""
     try:
         logger.info(f"Getting {count} random movies")
-        movies_table = dynamodb.Table(os.environ['MOVIES_TABLE_NAME'])
         
         # Get all movie IDs
         logger.info("Fetching all movie IDs")
-        response = movies_table.scan(
-            ProjectionExpression='movie_id',
-            Select='SPECIFIC_ATTRIBUTES'
-        )
-        
-        movie_ids = [item['movie_id'] for item in response['Items']]
+        movie_ids = [movie['movie_id'] for movie in scan_selection(dynamodb)]
         logger.info(f"Found {len(movie_ids)} total movies in database")
         
         # Randomly select desired number of movies
@@ -174,17 +184,7 @@ def get_random_movies(count: int, logger) -> List[Dict[str, Any]]:
         logger.info(f"Randomly selected {len(selected_ids)} movie IDs")
         
         # Get full movie data for selected IDs
-        movies = []
-        for movie_id in selected_ids:
-            logger.info(f"Fetching details for movie_id: {movie_id}")
-            response = movies_table.get_item(
-                Key={'movie_id': movie_id}
-            )
-            if 'Item' in response:
-                movies.append(response['Item'])
-                logger.info(f"Retrieved movie: {response['Item']['title']}")
-            else:
-                logger.info(f"Movie {movie_id} not found in database")
+        movies = get_movies(dynamodb, selected_ids)
         
         logger.info(f"Successfully retrieved {len(movies)} random movies")
         logger.info("Sample of random movies:")
@@ -197,14 +197,12 @@ def get_random_movies(count: int, logger) -> List[Dict[str, Any]]:
         logger.error(f"Error type: {type(e).__name__}")
         raise
 
+@timed('select_movies_with_openai')
 def select_movies_with_openai(movies: List[Dict[str, Any]], preferences: Dict[str, Any], logger) -> List[Dict[str, Any]]:
     """Use OpenAI to select the best 5 movies from the candidate list."""
     try:
         logger.info("Initializing OpenAI client")
-        client = OpenAI(
-            api_key=get_openai_api_key(logger),
-            timeout=120.0
-        )
+        client = get_openai_client(logger)
         
         # Create minimal movie choices text
         logger.info(f"Preparing prompt with {len(movies)} movies")
@@ -232,15 +230,16 @@ def select_movies_with_openai(movies: List[Dict[str, Any]], preferences: Dict[st
         }}"""
         
         logger.info("Calling OpenAI API")
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a movie expert helping select films that match user preferences."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
+        with span('openai_completion'):
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a movie expert helping select films that match user preferences."},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.7
+            )
         
         # Parse OpenAI response
         logger.info("Processing OpenAI response")
@@ -269,30 +268,16 @@ def select_movies_with_openai(movies: List[Dict[str, Any]], preferences: Dict[st
     except Exception as e:
         logger.error(f"Error in OpenAI selection: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
+        clients.reset_openai_key_on_auth_error(e)
         raise
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
-
-def convert_decimals(obj, to_float=True):
-    if isinstance(obj, dict):
-        return {k: convert_decimals(v, to_float) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals(x, to_float) for x in obj]
-    elif isinstance(obj, Decimal):
-        return float(obj) if to_float else obj
-    elif isinstance(obj, float):
-        return obj if to_float else Decimal(str(obj))
-    return obj
-
+@instrumented('suite2-movie-selection')
 def lambda_handler(event, context):
     """
     Main Lambda handler for Suite 2 movie selection.
     Returns 5 movies that match party preferences.
     """
-    logger = init_logger('suite2-movie-selection', event)
+    logger = init_logger('suite2-movie-selection', event, buffered=True)
     try:
         # Get party ID from event
         party_id = event['pathParameters']['party_id']
@@ -320,7 +305,7 @@ def lambda_handler(event, context):
         logger.info(f"Successfully selected {len(selected_movies)} movies")
         
         # Add detailed logging of movie structure
-        logger.info("Movie structure:", {
+        logger.debug("Movie structure:", lambda: {
             'first_movie': {
                 'type': type(selected_movies[0]).__name__,
                 'keys': list(selected_movies[0].keys()),
@@ -332,19 +317,17 @@ def lambda_handler(event, context):
         })
 
         try:
-            # Convert Decimals to floats for JSON serialization
-            selected_movies = convert_decimals(selected_movies, to_float=True)
-            selected_movies = json.loads(json.dumps(selected_movies))
-            
-            # Store selected movies in party data - convert floats back to Decimals
-            party_table = dynamodb.Table('popcorn-party-info')
-            party_response = party_table.get_item(Key={'party_id': party_id})
-            if 'Item' not in party_response:
-                raise Exception('Party not found')
-            
-            party = party_response['Item']
-            party['movies_suite2'] = convert_decimals(selected_movies, to_float=False)  # Convert to Decimals for DynamoDB
-            party_table.put_item(Item=party)
+            # Store selected movies in party data; they are catalog items
+            # read from DynamoDB, so they go back as-is
+            with span('party_write'):
+                party_table = dynamodb.Table('popcorn-party-info')
+                party_response = party_table.get_item(Key={'party_id': party_id})
+                if 'Item' not in party_response:
+                    raise Exception('Party not found')
+                
+                party = party_response['Item']
+                party['movies_suite2'] = selected_movies
+                party_table.put_item(Item=party)
 
             logger.info('Stored selected movies in party data', {
                 'party_id': party_id,
@@ -359,9 +342,9 @@ def lambda_handler(event, context):
                     'Access-Control-Allow-Methods': 'GET,OPTIONS',
                     'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'
                 },
-                'body': json.dumps({
+                'body': dumps({
                     'movies': selected_movies
-                }, default=decimal_default)
+                })
             }
             
         except Exception as e:
@@ -384,5 +367,7 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'error': str(e),
                 'message': 'Error processing request'
-            }, default=decimal_default)
-        }
\ No newline at end of file
+            })
+        }
+    finally:
+        logger.flush()
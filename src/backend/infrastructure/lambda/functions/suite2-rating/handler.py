@@ -1,18 +1,17 @@
 import json
-import boto3
 import redis
 import os
 from datetime import datetime
-from decimal import Decimal
+from typing import Dict, Any
+from botocore.exceptions import ClientError
+from common import clients
 from common.logging_util import init_logger
-
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
+from common.ratings_util import RATINGS_TTL_SECONDS, get_movie_ratings, is_legacy_ratings
+from common.serialization import dumps
+from common.metrics_util import instrumented
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = clients.dynamodb()
 preferences_table = dynamodb.Table(os.environ['PREFERENCES_TABLE_NAME'])
 party_table = dynamodb.Table(os.environ['PARTY_TABLE_NAME'])
 
@@ -23,6 +22,125 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+# Retries when a user's parallel taps race to create or migrate their record
+MAX_WRITE_ATTEMPTS = 3
+
+# migrate_ratings returns a resume key once less than this much time is left
+MIGRATION_TIME_RESERVE_MS = 30000
+
+def write_ratings(party_id: str, user_id: str, ratings: Dict[str, int], logger) -> Dict[str, int]:
+    """
+    Apply ratings to the user's suite2 record and return their previous
+    values for the same movies.
+
+    `preferences.movie_ratings` is a map keyed by movie_id, so the common
+    case is a single UpdateItem SET per movie that never touches other
+    ratings. A missing record, or one still in the legacy list layout, is
+    (re)written once in the map layout and the update is retried.
+    """
+    preference_id = f"{party_id}#{user_id}#suite2"
+    names = {'#prefs': 'preferences', '#ratings': 'movie_ratings', '#ts': 'timestamp'}
+    set_clauses = ['#ts = :ts', 'expires_at = if_not_exists(expires_at, :expires_at)']
+
+    for i, movie_id in enumerate(ratings):
+        names[f'#m{i}'] = movie_id
+        set_clauses.append(f'#prefs.#ratings.#m{i} = :r{i}')
+
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        timestamp = int(datetime.now().timestamp())
+        values = {
+            ':ts': timestamp,
+            ':expires_at': timestamp + RATINGS_TTL_SECONDS,
+            ':map': 'M'
+        }
+        for i, rating in enumerate(ratings.values()):
+            values[f':r{i}'] = rating
+
+        try:
+            response = preferences_table.update_item(
+                Key={'preference_id': preference_id},
+                UpdateExpression='SET ' + ', '.join(set_clauses),
+                ConditionExpression='attribute_type(#prefs.#ratings, :map)',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+                ReturnValues='UPDATED_OLD'
+            )
+            old_ratings = get_movie_ratings(response.get('Attributes', {}))
+            return {movie_id: int(rating) for movie_id, rating in old_ratings.items()}
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+        # No map yet: create the record, or migrate a legacy list record in place
+        existing = preferences_table.get_item(
+            Key={'preference_id': preference_id},
+            ConsistentRead=True
+        ).get('Item')
+
+        if existing and isinstance(existing.get('preferences', {}).get('movie_ratings'), dict):
+            # Another request created the map between our two calls
+            continue
+
+        current_ratings = get_movie_ratings(existing) if existing else {}
+        preference_item = {
+            'preference_id': preference_id,
+            'party_id': party_id,
+            'user_id': user_id,
+            'suite_number': 2,
+            'preferences': {
+                'movie_ratings': current_ratings
+            },
+            'timestamp': timestamp,
+            'expires_at': existing.get('expires_at', timestamp + RATINGS_TTL_SECONDS) if existing else timestamp + RATINGS_TTL_SECONDS
+        }
+
+        if existing:
+            # Only replace the exact legacy list we read; a write in between
+            # (even within the same second) fails the check and retries
+            legacy_ratings = existing.get('preferences', {}).get('movie_ratings')
+            if isinstance(legacy_ratings, list):
+                condition = {
+                    'ConditionExpression': 'attribute_type(#prefs.#ratings, :list) AND #prefs.#ratings = :prev',
+                    'ExpressionAttributeNames': {'#prefs': 'preferences', '#ratings': 'movie_ratings'},
+                    'ExpressionAttributeValues': {':list': 'L', ':prev': legacy_ratings}
+                }
+            else:
+                condition = {
+                    'ConditionExpression': 'attribute_not_exists(#prefs.#ratings)',
+                    'ExpressionAttributeNames': {'#prefs': 'preferences', '#ratings': 'movie_ratings'}
+                }
+            logger.info('Migrating legacy suite2 ratings record', {
+                'preference_id': preference_id,
+                'num_ratings': len(current_ratings)
+            })
+        else:
+            condition = {'ConditionExpression': 'attribute_not_exists(preference_id)'}
+
+        try:
+            preferences_table.put_item(Item=preference_item, **condition)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            logger.warn('Concurrent rating record initialization, retrying', {
+                'preference_id': preference_id,
+                'attempt': attempt + 1
+            })
+
+    raise Exception('Could not apply ratings after concurrent updates')
+
+def update_rating_aggregates(party_id: str, ratings: Dict[str, int], previous_ratings: Dict[str, int]):
+    """Apply rating deltas to the per-movie Redis aggregates in one round trip."""
+    pipe = redis_client.pipeline(transaction=False)
+    for movie_id, rating in ratings.items():
+        redis_key = f"suite2_ratings:{party_id}:{movie_id}"
+        if movie_id in previous_ratings:
+            pipe.hincrby(redis_key, 'sum_ratings', rating - previous_ratings[movie_id])
+        else:
+            pipe.hincrby(redis_key, 'total_ratings', 1)
+            pipe.hincrby(redis_key, 'sum_ratings', rating)
+    pipe.execute()
+
+@instrumented('submit_rating')
 def submit_rating(event, context):
     """
     Submit a rating (1-10) for a movie in Suite 2
@@ -58,56 +176,19 @@ def submit_rating(event, context):
                 'body': json.dumps({'error': 'Rating must be between 1 and 10'})
             }
         
-        # Create preference record
         preference_id = f"{party_id}#{user_id}#suite2"
-        timestamp = int(datetime.now().timestamp())
-        
-        # Get existing preferences or create new
-        response = preferences_table.get_item(Key={'preference_id': preference_id})
-        existing_prefs = response.get('Item', {})
-        
-        # Initialize or update movie ratings
-        current_ratings = existing_prefs.get('preferences', {}).get('movie_ratings', [])
-        
-        # Update or add new rating
-        rating_updated = False
-        for r in current_ratings:
-            if r['movie_id'] == movie_id:
-                r['rating'] = rating
-                rating_updated = True
-                break
-                
-        if not rating_updated:
-            current_ratings.append({
-                'movie_id': movie_id,
-                'rating': rating
-            })
-        
-        # Prepare complete preference item
-        preference_item = {
-            'preference_id': preference_id,
-            'party_id': party_id,
-            'user_id': user_id,
-            'suite_number': 2,
-            'preferences': {
-                'movie_ratings': current_ratings
-            },
-            'timestamp': timestamp
-        }
         
         # Save to DynamoDB
-        preferences_table.put_item(Item=preference_item)
+        previous_ratings = write_ratings(party_id, user_id, {movie_id: rating}, logger)
         
         # Update Redis for real-time access
-        redis_key = f"suite2_ratings:{party_id}:{movie_id}"
-        redis_client.hincrby(redis_key, 'total_ratings', 1)
-        redis_client.hincrby(redis_key, 'sum_ratings', rating)
+        update_rating_aggregates(party_id, {movie_id: rating}, previous_ratings)
         
         logger.info('Rating saved successfully', {
             'party_id': party_id,
             'movie_id': movie_id,
             'preference_id': preference_id,
-            'total_ratings': len(current_ratings)
+            'updated_existing': movie_id in previous_ratings
         })
 
         return {
@@ -132,6 +213,98 @@ def submit_rating(event, context):
             'body': json.dumps({'error': 'Could not submit rating'})
         }
 
+@instrumented('submit_ratings')
+def submit_ratings(event, context):
+    """
+    Submit all of a user's Suite 2 ratings (1-10) in a single request
+    """
+
+    logger = init_logger('submit_ratings', event)
+
+    try:
+        party_id = event['pathParameters']['party_id']
+
+        body = json.loads(event['body'])
+        user_id = body['user_id']
+
+        # Collapse to one rating per movie, last one wins
+        new_ratings = {}
+        for r in body['ratings']:
+            new_ratings[str(r['movie_id'])] = int(r['rating'])
+
+        logger.info('Processing batch rating submission', {
+            'party_id': party_id,
+            'user_id': user_id,
+            'num_ratings': len(new_ratings)
+        })
+
+        if not new_ratings or not all(1 <= rating <= 10 for rating in new_ratings.values()):
+            logger.warn('Invalid batch rating payload', {
+                'party_id': party_id,
+                'user_id': user_id
+            })
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Credentials': True
+                },
+                'body': json.dumps({'error': 'Ratings must be a non-empty list with values between 1 and 10'})
+            }
+
+        preference_id = f"{party_id}#{user_id}#suite2"
+
+        # One UpdateItem sets every rating in the batch
+        previous_ratings = write_ratings(party_id, user_id, new_ratings, logger)
+
+        # Apply only the deltas to the Redis aggregates in one round trip
+        update_rating_aggregates(party_id, new_ratings, previous_ratings)
+
+        logger.info('Batch ratings saved successfully', {
+            'party_id': party_id,
+            'preference_id': preference_id,
+            'num_submitted': len(new_ratings),
+            'num_updated': len(previous_ratings)
+        })
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Credentials': True
+            },
+            'body': json.dumps({
+                'message': 'Ratings recorded successfully',
+                'preference_id': preference_id,
+                'num_ratings': len(new_ratings)
+            })
+        }
+
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warn('Malformed batch rating request', {'error': str(e)})
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Credentials': True
+            },
+            'body': json.dumps({'error': 'Request must include user_id and a list of ratings'})
+        }
+
+    except Exception as e:
+        logger.error('Failed to submit ratings', e, {
+            'party_id': party_id if 'party_id' in locals() else None
+        })
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Credentials': True
+            },
+            'body': json.dumps({'error': 'Could not submit ratings'})
+        }
+
+@instrumented('get_ratings')
 def get_ratings(event, context):
     """
     Get ratings for a movie in Suite 2
@@ -177,10 +350,9 @@ def get_ratings(event, context):
             ratings = []
             for item in response['Items']:
                 if item.get('suite_number') == 2:
-                    movie_ratings = item.get('preferences', {}).get('movie_ratings', [])
-                    for r in movie_ratings:
-                        if r['movie_id'] == movie_id:
-                            ratings.append(r['rating'])
+                    user_rating = get_movie_ratings(item).get(movie_id)
+                    if user_rating is not None:
+                        ratings.append(user_rating)
             
             total_ratings = len(ratings)
             avg_rating = sum(ratings) / total_ratings if ratings else 0
@@ -203,12 +375,12 @@ def get_ratings(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Credentials': True
             },
-            'body': json.dumps({
+            'body': dumps({
                 'party_id': party_id,
                 'movie_id': movie_id,
                 'total_ratings': total_ratings,
                 'average_rating': avg_rating
-            }, default=decimal_default)
+            })
         }
         
     except Exception as e:
@@ -219,4 +391,83 @@ def get_ratings(event, context):
         return {
             'statusCode': 500,
             'body': json.dumps({'error': 'Could not get ratings'})
-        }
\ No newline at end of file
+        }
+
+@instrumented('migrate_ratings')
+def migrate_ratings(event, context):
+    """
+    One-off backfill that rewrites legacy list-layout suite2 records into
+    the movie_id-keyed map layout and gives them a TTL. Records are also
+    migrated lazily on their next rating write, so this only needs to run
+    once to clean up parties that were never revisited.
+
+    Deployed as popcorn-suite2-rating-migration and invoked by hand. If
+    the scan cannot finish before the function times out, the response
+    carries `next_key`; invoke again with {"start_key": <next_key>} to
+    continue. Re-running from the start is also safe.
+    """
+
+    logger = init_logger('migrate_ratings', event)
+
+    migrated = 0
+    scan_kwargs = {
+        'FilterExpression': 'suite_number = :suite_num',
+        'ExpressionAttributeValues': {':suite_num': 2}
+    }
+    if event and event.get('start_key'):
+        scan_kwargs['ExclusiveStartKey'] = event['start_key']
+
+    try:
+        next_key = None
+        while True:
+            response = preferences_table.scan(**scan_kwargs)
+
+            for item in response['Items']:
+                if not is_legacy_ratings(item):
+                    continue
+
+                timestamp = int(item.get('timestamp', datetime.now().timestamp()))
+                legacy_ratings = item['preferences']['movie_ratings']
+                try:
+                    preferences_table.update_item(
+                        Key={'preference_id': item['preference_id']},
+                        UpdateExpression='SET #prefs.#ratings = :ratings, expires_at = if_not_exists(expires_at, :expires_at)',
+                        ConditionExpression='attribute_type(#prefs.#ratings, :list) AND #prefs.#ratings = :prev',
+                        ExpressionAttributeNames={'#prefs': 'preferences', '#ratings': 'movie_ratings'},
+                        ExpressionAttributeValues={
+                            ':ratings': get_movie_ratings(item),
+                            ':expires_at': timestamp + RATINGS_TTL_SECONDS,
+                            ':list': 'L',
+                            ':prev': legacy_ratings
+                        }
+                    )
+                    migrated += 1
+                except ClientError as e:
+                    # Already migrated by a concurrent rating write
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+            # Stop with a resume point while there is time left to report it
+            if context and context.get_remaining_time_in_millis() < MIGRATION_TIME_RESERVE_MS:
+                next_key = response['LastEvaluatedKey']
+                break
+
+        logger.info('Suite 2 ratings migration complete' if next_key is None else 'Suite 2 ratings migration paused', {
+            'migrated': migrated,
+            'next_key': next_key
+        })
+        return {
+            'statusCode': 200,
+            'body': dumps({'migrated': migrated, 'next_key': next_key})
+        }
+
+    except Exception as e:
+        logger.error('Failed to migrate ratings', e, {'migrated': migrated})
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Could not migrate ratings', 'migrated': migrated})
+        }
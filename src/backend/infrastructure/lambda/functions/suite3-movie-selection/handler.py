@@ -1,43 +1,47 @@
 import os
 import json
-import boto3
 import random
 from typing import List, Dict, Any
 from botocore.exceptions import ClientError
-from openai import OpenAI
-from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
+from common import clients
 from common.logging_util import init_logger
+from common.preferences_util import get_party_aggregate
+from common.ratings_util import get_movie_ratings
+from common.catalog_util import scan_selection, get_movies
+from common.serialization import dumps, to_native
+from common.metrics_util import instrumented, span, timed, count
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-secretsmanager = boto3.client('secretsmanager', region_name='us-east-1')
+dynamodb = clients.dynamodb()
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
-
-def get_openai_api_key(logger):
-    """Retrieve OpenAI API key from Secrets Manager."""
+@timed('openai_client')
+def get_openai_client(logger):
+    """
+    OpenAI client; openai is only imported, and the key only fetched from
+    Secrets Manager, the first time a container calls the model.
+    """
     try:
-        secret_name = "popcorn/openai"
-        logger.info(f"Fetching OpenAI API key from Secrets Manager: {secret_name}")
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
-        logger.info("Successfully retrieved OpenAI API key from Secrets Manager")
-        return response['SecretString']
+        return clients.openai_client(timeout=120.0)
     except ClientError as e:
         logger.error(f"Failed to get OpenAI API key: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
         logger.error(f"Error code: {e.response['Error']['Code'] if 'Error' in e.response else 'No error code'}")
         raise
 
+@timed('party_preferences')
 def get_party_preferences(party_id: str, logger) -> Dict[str, Any]:
     """Get Suite 1 preferences for the party from DynamoDB."""
     try:
         logger.info(f"Getting Suite 1 preferences for party: {party_id}")
         preferences_table = dynamodb.Table(os.environ['PREFERENCES_TABLE_NAME'])
         
+        # Prefer the aggregate folded in by suite1-preferences at write time
+        aggregate = get_party_aggregate(preferences_table, party_id)
+        if aggregate:
+            logger.info(f"Using precomputed preference aggregate for {aggregate['member_count']} members")
+            return aggregate
+        
         response = preferences_table.query(
             IndexName='PartyIndex',
             KeyConditionExpression=Key('party_id').eq(party_id),
@@ -55,10 +59,13 @@ def get_party_preferences(party_id: str, logger) -> Dict[str, Any]:
         genre_dealbreakers = set()
         decade_preferences = set()
         year_cutoff = None
+        genre_weights = {}
         
         for pref in response['Items']:
             prefs = pref.get('preferences', {})
             genre_preferences.update(prefs.get('genre_preferences', []))
+            for genre in prefs.get('genre_preferences', []):
+                genre_weights[genre] = genre_weights.get(genre, 0) + 1
             genre_dealbreakers.update(prefs.get('genre_dealbreakers', []))
             decade_preferences.update(prefs.get('decade_preferences', []))
             
@@ -70,13 +77,16 @@ def get_party_preferences(party_id: str, logger) -> Dict[str, Any]:
             'genre_preferences': list(genre_preferences),
             'genre_dealbreakers': list(genre_dealbreakers),
             'decade_preferences': list(decade_preferences),
-            'year_cutoff': year_cutoff
+            'year_cutoff': year_cutoff,
+            'genre_weights': genre_weights,
+            'member_count': len(response['Items'])
         }
     except Exception as e:
         logger.error(f"Error getting party preferences: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
         raise
 
+@timed('suite2_ratings')
 def get_suite2_ratings(party_id: str, logger) -> Dict[str, Any]:
     """Get Suite 2 ratings for the party from DynamoDB."""
     try:
@@ -99,25 +109,22 @@ def get_suite2_ratings(party_id: str, logger) -> Dict[str, Any]:
         rated_movies = set()
         genre_ratings = {}
         
+        all_ratings = [get_movie_ratings(pref) for pref in response['Items']]
+        for movie_ratings in all_ratings:
+            rated_movies.update(movie_ratings)
+        
+        # Get genres of all rated movies in one batch
+        movie_genres = {
+            movie['movie_id']: movie.get('genres', [])
+            for movie in get_movies(dynamodb, list(rated_movies), projection='movie_id, genres')
+        }
+        
         # Process all ratings
-        for pref in response['Items']:
-            movie_ratings = pref.get('preferences', {}).get('movie_ratings', [])
-            
-            for rating in movie_ratings:
-                movie_id = rating.get('movie_id')
-                rating_value = rating.get('rating', 0)
-                rated_movies.add(movie_id)
-                
-                # Get movie genres
-                movies_table = dynamodb.Table(os.environ['MOVIES_TABLE_NAME'])
-                movie_response = movies_table.get_item(Key={'movie_id': movie_id})
-                
-                if 'Item' in movie_response:
-                    movie = movie_response['Item']
-                    genres = movie.get('genres', [])
-                    
+        for movie_ratings in all_ratings:
+            for movie_id, rating_value in movie_ratings.items():
+                if movie_id in movie_genres:
                     # Update genre ratings
-                    for genre in genres:
+                    for genre in movie_genres[movie_id]:
                         if genre not in genre_ratings:
                             genre_ratings[genre] = {'total': 0, 'count': 0}
                         genre_ratings[genre]['total'] += rating_value
@@ -140,21 +147,15 @@ def get_suite2_ratings(party_id: str, logger) -> Dict[str, Any]:
         logger.error(f"Error type: {type(e).__name__}")
         raise
 
+@timed('get_matching_movies')
 def get_matching_movies(preferences: Dict[str, Any], rated_movies: set, logger) -> List[Dict[str, Any]]:
     """Get movies matching preferences, excluding previously rated ones."""
     try:
         logger.info("Starting movie matching process")
-        movies_table = dynamodb.Table(os.environ['MOVIES_TABLE_NAME'])
         matching_movies = []
         
-        response = movies_table.scan()
-        movies = response['Items']
-        
-        while 'LastEvaluatedKey' in response:
-            response = movies_table.scan(
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            movies.extend(response['Items'])
+        # Filter on the lightweight selection view, then load the top matches in full
+        movies = scan_selection(dynamodb)
         
         logger.info(f"Retrieved {len(movies)} total movies to process")
         
@@ -185,13 +186,15 @@ def get_matching_movies(preferences: Dict[str, Any], rated_movies: set, logger)
             
             matching_movies.append(movie)
         
+        count('movies_matched', len(matching_movies))
         logger.info(f"Found {len(matching_movies)} matching movies (excluding rated ones)")
         
-        # Sort movies by number of matching preferred genres to get most relevant ones
-        matching_movies.sort(key=lambda m: len(set(m['genres']).intersection(set(preferences['genre_preferences']))), reverse=True)
+        # Sort movies by how many members chose their genres to get most relevant ones
+        genre_weights = preferences.get('genre_weights', {})
+        matching_movies.sort(key=lambda m: sum(genre_weights.get(g, 0) for g in m['genres']), reverse=True)
         
         # Take top 50 most relevant movies only
-        top_movies = matching_movies[:50]
+        top_movies = get_movies(dynamodb, [m['movie_id'] for m in matching_movies[:50]])
         
         logger.info(f"Selected top {len(top_movies)} most relevant movies")
         logger.info("Sample of matched movies:")
@@ -204,6 +207,7 @@ def get_matching_movies(preferences: Dict[str, Any], rated_movies: set, logger)
         logger.error(f"Error type: {type(e).__name__}")
         raise
 
+@timed('select_movies_with_openai')
 def select_movies_with_openai(movies: List[Dict[str, Any]], 
                             preferences: Dict[str, Any], 
                             genre_ratings: Dict[str, float],
@@ -211,14 +215,11 @@ def select_movies_with_openai(movies: List[Dict[str, Any]],
     """Use OpenAI to select movies based on preferences and previous ratings."""
     try:
         logger.info("Initializing OpenAI client")
-        client = OpenAI(
-            api_key=get_openai_api_key(logger),
-            timeout=120.0
-        )
+        client = get_openai_client(logger)
         
         # Handle Decimal serialization for genre ratings
         logger.info("Serializing genre ratings")
-        genre_ratings = json.loads(json.dumps(genre_ratings, default=str))
+        genre_ratings = to_native(genre_ratings)
         
         # Create movie choices text with full info for model context
         movie_choices = "\n".join([
@@ -262,15 +263,16 @@ def select_movies_with_openai(movies: List[Dict[str, Any]],
         }}"""
         
         logger.info("Calling OpenAI API")
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo-1106",
-            messages=[
-                {"role": "system", "content": "You are a movie expert helping select films based on user preferences and past ratings."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
+        with span('openai_completion'):
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo-1106",
+                messages=[
+                    {"role": "system", "content": "You are a movie expert helping select films based on user preferences and past ratings."},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.7
+            )
         
         # Parse OpenAI response
         logger.info("Processing OpenAI response")
@@ -292,25 +294,16 @@ def select_movies_with_openai(movies: List[Dict[str, Any]],
     except Exception as e:
         logger.error(f"Error in OpenAI selection: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
+        clients.reset_openai_key_on_auth_error(e)
         raise
 
-def convert_decimals(obj, to_float=True):
-    if isinstance(obj, dict):
-        return {k: convert_decimals(v, to_float) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals(x, to_float) for x in obj]
-    elif isinstance(obj, Decimal):
-        return float(obj) if to_float else obj
-    elif isinstance(obj, float):
-        return obj if to_float else Decimal(str(obj))
-    return obj
-
+@instrumented('suite3-movie-selection')
 def lambda_handler(event, context):
     """
     Main Lambda handler for Suite 3 movie selection.
     Returns 5 movies with full details plus blind summaries for voting.
     """
-    logger = init_logger('suite3-movie-selection', event)
+    logger = init_logger('suite3-movie-selection', event, buffered=True)
     try:
         # Get party ID from event
         party_id = event['pathParameters']['party_id']
@@ -327,10 +320,6 @@ def lambda_handler(event, context):
         # Get matching movies (excluding rated ones)
         matching_movies = get_matching_movies(preferences, rated_movies, logger)
         
-        # Handle Decimal serialization for matching movies
-        logger.info("Serializing matching movies")
-        matching_movies = json.loads(json.dumps(matching_movies, default=str))
-        
         if len(matching_movies) < 5:
             logger.error(f"Insufficient matching movies: {len(matching_movies)}")
             raise Exception("Not enough matching movies available for selection")
@@ -343,20 +332,17 @@ def lambda_handler(event, context):
             logger
         )
         
-        # Handle Decimal serialization for final response
-        logger.info("Preparing final response")
-        selected_movies = convert_decimals(selected_movies, to_float=True)
-        selected_movies = json.loads(json.dumps(selected_movies))
-        
-        # Store selected movies in party data
-        party_table = dynamodb.Table('popcorn-party-info')
-        party_response = party_table.get_item(Key={'party_id': party_id})
-        if 'Item' not in party_response:
-            raise Exception('Party not found')
-        
-        party = party_response['Item']
-        party['movies_suite3'] = convert_decimals(selected_movies, to_float=False)
-        party_table.put_item(Item=party)
+        # Store selected movies in party data; apart from the blind summary
+        # they are catalog items read from DynamoDB, so they go back as-is
+        with span('party_write'):
+            party_table = dynamodb.Table('popcorn-party-info')
+            party_response = party_table.get_item(Key={'party_id': party_id})
+            if 'Item' not in party_response:
+                raise Exception('Party not found')
+            
+            party = party_response['Item']
+            party['movies_suite3'] = selected_movies
+            party_table.put_item(Item=party)
 
         logger.info('Stored selected movies in party data', {
             'party_id': party_id,
@@ -370,7 +356,7 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Methods': 'GET,OPTIONS',
                 'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'
             },
-            'body': json.dumps({
+            'body': dumps({
                 'movies': selected_movies
             })
         }
@@ -389,4 +375,6 @@ def lambda_handler(event, context):
                 'error': str(e),
                 'message': 'Error processing request'
             })
-        }
\ No newline at end of file
+        }
+    finally:
+        logger.flush()
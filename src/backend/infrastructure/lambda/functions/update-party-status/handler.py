@@ -1,19 +1,13 @@
 import json
-import boto3
 import redis
 import os
-from decimal import Decimal
 from common.logging_util import init_logger
-
-# Add this class for JSON serialization
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return str(obj)
-        return super(DecimalEncoder, self).default(obj)
+from common import clients, party_cache
+from common.serialization import dumps
+from common.metrics_util import instrumented
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = clients.dynamodb()
 party_table = dynamodb.Table(os.environ['PARTY_TABLE_NAME'])
 
 # Initialize Redis client
@@ -23,6 +17,7 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+@instrumented('update_party_status')
 def update_party_status(event, context):
     """
     Update a party's status, current suite, and/or participant progress
@@ -75,10 +70,9 @@ def update_party_status(event, context):
             party['current_suite'] = body['current_suite']
 
             # Update Redis for party status
-            redis_key = f"party:{party_id}"
-            redis_client.hmset(redis_key, {
+            party_cache.set_party_state(redis_client, party_id, {
                 'status': body['status'],
-                'current_suite': str(body['current_suite'])
+                'current_suite': body['current_suite']
             })
 
         # Handle participant progress update
@@ -120,7 +114,7 @@ def update_party_status(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Credentials': True
             },
-            'body': json.dumps(party, cls=DecimalEncoder)
+            'body': dumps(party)
         }
         
     except Exception as e:
@@ -1,12 +1,14 @@
 import json
-import boto3
 import redis
 import os
+import time
 from datetime import datetime
 from common.logging_util import init_logger
+from common import clients, party_cache
+from common.metrics_util import instrumented, span, count
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = clients.dynamodb()
 votes_table = dynamodb.Table(os.environ['VOTES_TABLE_NAME'])
 party_table = dynamodb.Table(os.environ['PARTY_TABLE_NAME'])
 
@@ -25,6 +27,16 @@ CORS_HEADERS = {
     'Access-Control-Allow-Credentials': True
 }
 
+VALID_VOTES = {'yes', 'no', 'seen'}
+
+# Suite 3 presents at most 50 movies; this also keeps the previous-vote
+# lookup within a single BatchGetItem (100 keys)
+MAX_BALLOT_SIZE = 100
+
+# BatchGetItem retries for unprocessed keys before the ballot is failed
+MAX_BATCH_GET_ATTEMPTS = 5
+
+@instrumented('submit_vote')
 def submit_vote(event, context):
     """
     Submit a vote for a movie in Suite 3
@@ -58,12 +70,15 @@ def submit_vote(event, context):
             'vote': vote,
             'timestamp': int(datetime.now().timestamp())
         }
-        votes_table.put_item(Item=vote_item)
+        with span('vote_write'):
+            votes_table.put_item(Item=vote_item)
+        count('votes_submitted')
         
         # Update real-time counts in Redis
         redis_key = f"votes:{party_id}:{movie_id}"
-        redis_client.hincrby(redis_key, vote, 1)
-        redis_client.hincrby(redis_key, 'total', 1)
+        with span('vote_tally'):
+            redis_client.hincrby(redis_key, vote, 1)
+            redis_client.hincrby(redis_key, 'total', 1)
         
         logger.info('Vote saved successfully', {
             'vote_id': vote_id,
@@ -72,7 +87,8 @@ def submit_vote(event, context):
         })
 
         # Check if all participants have voted
-        party_response = party_table.get_item(Key={'party_id': party_id})
+        with span('completion_check'):
+            party_response = party_table.get_item(Key={'party_id': party_id})
         if 'Item' in party_response:
             party = party_response['Item']
             total_participants = len(party['participants'])
@@ -93,7 +109,7 @@ def submit_vote(event, context):
                 })
 
                 # All votes are in for this movie
-                redis_client.hset(f"party:{party_id}", 'voting_complete', 'true')
+                party_cache.set_party_state(redis_client, party_id, {'voting_complete': 'true'})
         
         return {
             'statusCode': 200,
@@ -115,6 +131,177 @@ def submit_vote(event, context):
             'body': json.dumps({'error': 'Could not process vote'})
         }
 
+def get_previous_votes(vote_ids):
+    """
+    Votes already recorded under `vote_ids`, as {movie_id: vote}. Retries
+    unprocessed keys with backoff and raises if some are still unread after
+    MAX_BATCH_GET_ATTEMPTS, since a missed key would be taken as a first
+    vote and double count the tally.
+    """
+    previous_votes = {}
+    request_items = {
+        votes_table.name: {
+            'Keys': [{'vote_id': vote_id} for vote_id in vote_ids],
+            'ProjectionExpression': 'movie_id, vote'
+        }
+    }
+    attempt = 0
+    while request_items:
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        for item in response.get('Responses', {}).get(votes_table.name, []):
+            previous_votes[item['movie_id']] = item['vote']
+        request_items = response.get('UnprocessedKeys') or {}
+        if request_items:
+            attempt += 1
+            if attempt >= MAX_BATCH_GET_ATTEMPTS:
+                raise Exception('Could not read previous votes after repeated throttling')
+            time.sleep(min(0.05 * 2 ** attempt, 1.0))
+    return previous_votes
+
+@instrumented('submit_votes')
+def submit_votes(event, context):
+    """
+    Submit a user's full Suite 3 ballot (one vote per movie) in a single request
+    """
+
+    logger = init_logger('submit_votes', event)
+
+    try:
+        party_id = event['pathParameters']['party_id']
+        body = json.loads(event['body'])
+        user_id = body['user_id']
+
+        # Collapse to one vote per movie, last one wins
+        ballot = {}
+        for entry in body['votes']:
+            ballot[str(entry['movie_id'])] = entry['vote']
+
+        logger.info('Processing ballot submission', {
+            'party_id': party_id,
+            'user_id': user_id,
+            'num_votes': len(ballot)
+        })
+
+        if len(ballot) > MAX_BALLOT_SIZE:
+            logger.warn('Ballot too large', {
+                'party_id': party_id,
+                'user_id': user_id,
+                'num_votes': len(ballot)
+            })
+            return {
+                'statusCode': 400,
+                'headers': CORS_HEADERS,
+                'body': json.dumps({'error': f'A ballot may contain at most {MAX_BALLOT_SIZE} votes'})
+            }
+
+        if not ballot or any(vote not in VALID_VOTES for vote in ballot.values()):
+            logger.warn('Invalid ballot', {
+                'party_id': party_id,
+                'user_id': user_id
+            })
+            return {
+                'statusCode': 400,
+                'headers': CORS_HEADERS,
+                'body': json.dumps({
+                    'error': f'Votes must be a non-empty list with values in: {", ".join(sorted(VALID_VOTES))}'
+                })
+            }
+
+        vote_ids = {movie_id: f"{party_id}#{user_id}#{movie_id}" for movie_id in ballot}
+
+        # Look up any votes this user already cast so resubmissions only
+        # move tallies instead of double counting them
+        with span('previous_votes'):
+            previous_votes = get_previous_votes(list(vote_ids.values()))
+
+        # Write the whole ballot with BatchWriteItem
+        timestamp = int(datetime.now().timestamp())
+        with span('vote_write'), votes_table.batch_writer() as batch:
+            for movie_id, vote in ballot.items():
+                batch.put_item(Item={
+                    'vote_id': vote_ids[movie_id],
+                    'party_id': party_id,
+                    'user_id': user_id,
+                    'movie_id': movie_id,
+                    'vote': vote,
+                    'timestamp': timestamp
+                })
+        count('votes_submitted', len(ballot))
+
+        # Apply tally deltas and read back totals in one MULTI/EXEC
+        pipe = redis_client.pipeline(transaction=True)
+        for movie_id, vote in ballot.items():
+            redis_key = f"votes:{party_id}:{movie_id}"
+            previous_vote = previous_votes.get(movie_id)
+            if previous_vote is None:
+                pipe.hincrby(redis_key, vote, 1)
+                pipe.hincrby(redis_key, 'total', 1)
+            elif previous_vote != vote:
+                pipe.hincrby(redis_key, previous_vote, -1)
+                pipe.hincrby(redis_key, vote, 1)
+        for movie_id in ballot:
+            pipe.hget(f"votes:{party_id}:{movie_id}", 'total')
+        with span('vote_tally'):
+            results = pipe.execute()
+        totals = [int(total or 0) for total in results[-len(ballot):]]
+
+        logger.info('Ballot saved successfully', {
+            'party_id': party_id,
+            'user_id': user_id,
+            'num_votes': len(ballot),
+            'num_changed': sum(1 for m, v in ballot.items() if m in previous_votes and previous_votes[m] != v)
+        })
+
+        # Evaluate completion once for the whole ballot
+        voting_complete = False
+        with span('completion_check'):
+            party_response = party_table.get_item(
+                Key={'party_id': party_id},
+                ProjectionExpression='participants'
+            )
+        if 'Item' in party_response:
+            total_participants = len(party_response['Item']['participants'])
+            voting_complete = all(total >= total_participants for total in totals)
+
+            logger.info('Vote count status', {
+                'party_id': party_id,
+                'min_votes_count': min(totals),
+                'total_participants': total_participants
+            })
+
+            if voting_complete:
+                logger.info('All participants have voted', {'party_id': party_id})
+                party_cache.set_party_state(redis_client, party_id, {'voting_complete': 'true'})
+
+        return {
+            'statusCode': 200,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({
+                'message': 'Votes recorded successfully',
+                'vote_ids': list(vote_ids.values()),
+                'voting_complete': voting_complete
+            })
+        }
+
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warn('Malformed ballot request', {'error': str(e)})
+        return {
+            'statusCode': 400,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({'error': 'Request must include user_id and a list of votes'})
+        }
+
+    except Exception as e:
+        logger.error('Failed to process ballot', e, {
+            'party_id': party_id if 'party_id' in locals() else None
+        })
+        return {
+            'statusCode': 500,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({'error': 'Could not process votes'})
+        }
+
+@instrumented('get_votes')
 def get_votes(event, context):
     """
     Get current voting status for all movies in a party
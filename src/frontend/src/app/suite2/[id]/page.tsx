@@ -173,30 +173,32 @@ export default function Suite2Page() {
     setError('');
     
     try {
-      // Submit each rating
-      for (let i = 0; i < ratings.length; i++) {
-        const rating = ratings[i];
-        setSubmitProgress((i / ratings.length) * 100);
-        
-        const response = await fetch(
-          `${process.env.NEXT_PUBLIC_API_BASE_URL}/party/${params.id}/rate/${rating.movie_id}`,
-          {
-            method: 'PUT',
-            headers: {
-              'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-              user_id: userId,
-              rating: rating.rating
-            })
-          }
-        );
+      // Submit all ratings in a single request
+      setSubmitProgress(0);
 
-        if (!response.ok) {
-          throw new Error(`Failed to submit rating ${i + 1}`);
+      const response = await fetch(
+        `${process.env.NEXT_PUBLIC_API_BASE_URL}/party/${params.id}/rate`,
+        {
+          method: 'PUT',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            user_id: userId,
+            ratings: ratings.map(rating => ({
+              movie_id: rating.movie_id,
+              rating: rating.rating
+            }))
+          })
         }
+      );
+
+      if (!response.ok) {
+        throw new Error('Failed to submit ratings');
       }
 
+      setSubmitProgress(100);
+
       // If host, update party status
       if (isHost) {
         const updateResponse = await fetch(
@@ -489,7 +491,7 @@ export default function Suite2Page() {
               } as React.CSSProperties}
             />
             <p className="text-sm font-light text-white/50">
-              Submitting rating {Math.ceil((submitProgress / 100) * ratings.length)} of {ratings.length}
+              Submitting {ratings.length} ratings
             </p>
           </div>
         </div>
@@ -33,6 +33,7 @@ export default function Suite3Page() {
   // Current movie index for the stack
   const [currentMovieIndex, setCurrentMovieIndex] = useState(0);
   const [isVoting, setIsVoting] = useState(false);
+  const [ballot, setBallot] = useState<{ movie_id: string; vote: 'yes' | 'no' }[]>([]);
 
   // Handle client-side mounting
   useEffect(() => {
@@ -149,43 +150,48 @@ export default function Suite3Page() {
     if (params.id && userId) validateAndSetup();
   }, [params.id, userId, router]);
 
-  // Handle vote submission for a single movie
+  // Record a vote for a single movie; the full ballot is submitted after the last movie
   const handleVote = async (movieId: string, vote: 'yes' | 'no') => {
     if (isVoting) return;
     
+    const updatedBallot = [
+      ...ballot.filter(entry => entry.movie_id !== movieId),
+      { movie_id: movieId, vote }
+    ];
+    setBallot(updatedBallot);
+
+    // Move to next movie
+    if (currentMovieIndex < movies.length - 1) {
+      setCurrentMovieIndex(prev => prev + 1);
+      return;
+    }
+
     setIsVoting(true);
     
     try {
-      // Submit vote to API
+      // Submit the whole ballot to API
       const response = await fetch(
-        `${process.env.NEXT_PUBLIC_API_BASE_URL}/party/${params.id}/vote`,
+        `${process.env.NEXT_PUBLIC_API_BASE_URL}/party/${params.id}/votes`,
         {
           method: 'PUT',
           headers: {
             'Content-Type': 'application/json',
           },
           body: JSON.stringify({
-            party_id: params.id,
             user_id: userId,
-            movie_id: movieId,
-            vote
+            votes: updatedBallot
           })
         }
       );
 
       if (!response.ok) {
-        throw new Error('Failed to submit vote');
+        throw new Error('Failed to submit votes');
       }
       
-      // Move to next movie
-      if (currentMovieIndex < movies.length - 1) {
-        setCurrentMovieIndex(prev => prev + 1);
-      } else {
-        // All votes completed
-        await completeVoting();
-      }
+      // All votes completed
+      await completeVoting();
     } catch (error) {
-      setError(error instanceof Error ? error.message : 'Failed to submit vote');
+      setError(error instanceof Error ? error.message : 'Failed to submit votes');
     } finally {
       setIsVoting(false);
     }
@@ -0,0 +1,145 @@
+"""
+Measure Lambda cold-start init time: how long importing each handler
+module takes in a fresh interpreter, and which packages that time goes to
+(from `python -X importtime`).
+
+Needs the Lambda dependencies (boto3, redis, openai) installed locally.
+No AWS calls are made; clients are only constructed. Usage:
+
+    python tests/lambda/benchmarks/cold_start_benchmark.py [--runs 5] [--top 8]
+        [--baseline <git-ref>] [handler ...]
+
+With --baseline the same handlers are also measured as they were at
+<git-ref> (e.g. the commit before a change) and shown side by side.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from collections import defaultdict
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+FUNCTIONS_PATH = os.path.join('src', 'backend', 'infrastructure', 'lambda', 'functions')
+
+# Module-level code reads these; the values only need to exist
+DUMMY_ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'benchmark',
+    'AWS_SECRET_ACCESS_KEY': 'benchmark',
+    'MOVIES_TABLE_NAME': 'popcorn-movies',
+    'CATALOG_TABLE_NAME': 'popcorn-catalog',
+    'PARTY_TABLE_NAME': 'popcorn-party-info',
+    'USER_TABLE_NAME': 'popcorn-user-info',
+    'PREFERENCES_TABLE_NAME': 'popcorn-user-preferences',
+    'VOTES_TABLE_NAME': 'popcorn-final-votes',
+    'REDIS_HOST': 'localhost',
+    'OPENAI_API_KEY': 'benchmark'
+}
+
+INIT_SCRIPT = """
+import sys, time
+sys.path[:0] = [{handler_dir!r}, {functions_dir!r}]
+start = time.perf_counter()
+import handler
+print((time.perf_counter() - start) * 1000)
+"""
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \| \s*(\S+)$')
+
+def handler_names(functions_dir):
+    return sorted(
+        name for name in os.listdir(functions_dir)
+        if os.path.isfile(os.path.join(functions_dir, name, 'handler.py'))
+    )
+
+def measure_once(functions_dir, handler):
+    """Init time in ms and import ms per top-level package, for one cold import."""
+    env = dict(os.environ)
+    for key, value in DUMMY_ENV.items():
+        env.setdefault(key, value)
+    script = INIT_SCRIPT.format(handler_dir=os.path.join(functions_dir, handler), functions_dir=functions_dir)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        capture_output=True, text=True, env=env, cwd=os.path.join(functions_dir, handler)
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'{handler} failed to import:\n{result.stderr.splitlines()[-1]}')
+
+    # Each module's self time goes to its top-level package, so nested
+    # imports (boto3 pulling in botocore, ...) are attributed where they belong
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            packages[match.group(2).split('.')[0]] += int(match.group(1)) / 1000
+    # The handler's own self time is its module body: mostly building clients
+    packages['handler body'] = packages.pop('handler', 0.0)
+    return float(result.stdout.strip().splitlines()[-1]), packages
+
+def measure(functions_dirs, handler, runs):
+    """
+    Median init ms and per-package ms for `handler` in each of functions_dirs.
+    Runs alternate between the directories so machine noise hits all alike.
+    """
+    inits = [[] for _ in functions_dirs]
+    breakdowns = [defaultdict(list) for _ in functions_dirs]
+    for _ in range(runs):
+        for i, functions_dir in enumerate(functions_dirs):
+            init_ms, packages = measure_once(functions_dir, handler)
+            inits[i].append(init_ms)
+            for package, ms in packages.items():
+                breakdowns[i][package].append(ms)
+    return [
+        (statistics.median(init), {package: statistics.median(ms) for package, ms in breakdown.items()})
+        for init, breakdown in zip(inits, breakdowns)
+    ]
+
+def export_functions(ref, target_dir):
+    """Check out the Lambda functions directory as of `ref` into target_dir."""
+    archive = subprocess.run(
+        ['git', 'archive', '--format=tar', ref, FUNCTIONS_PATH],
+        cwd=REPO_ROOT, capture_output=True, check=True
+    ).stdout
+    archive_path = os.path.join(target_dir, 'functions.tar')
+    with open(archive_path, 'wb') as f:
+        f.write(archive)
+    with tarfile.open(archive_path) as tar:
+        tar.extractall(target_dir)
+    return os.path.join(target_dir, FUNCTIONS_PATH)
+
+def format_packages(packages, top):
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return ', '.join(f'{package} {ms:.0f}' for package, ms in heaviest)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('handlers', nargs='*', help='handler directories (default: all)')
+    parser.add_argument('--runs', type=int, default=5, help='cold imports per handler; the median is reported')
+    parser.add_argument('--top', type=int, default=8, help='packages to list per handler')
+    parser.add_argument('--baseline', help='git ref to compare against')
+    args = parser.parse_args()
+
+    functions_dir = os.path.join(REPO_ROOT, FUNCTIONS_PATH)
+    handlers = args.handlers or handler_names(functions_dir)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_dir = export_functions(args.baseline, tmp) if args.baseline else None
+
+        print(f'median of {args.runs} cold imports; package times are import ms (module self time summed per package)\n')
+        for handler in handlers:
+            if baseline_dir and os.path.isdir(os.path.join(baseline_dir, handler)):
+                (before_ms, before_packages), (init_ms, packages) = measure([baseline_dir, functions_dir], handler, args.runs)
+                print(f'{handler}: {before_ms:.0f} ms -> {init_ms:.0f} ms ({init_ms - before_ms:+.0f} ms)')
+                print(f'  before: {format_packages(before_packages, args.top)}')
+                print(f'  after:  {format_packages(packages, args.top)}')
+            else:
+                [(init_ms, packages)] = measure([functions_dir], handler, args.runs)
+                print(f'{handler}: {init_ms:.0f} ms')
+                print(f'  {format_packages(packages, args.top)}')
+
+if __name__ == '__main__':
+    main()
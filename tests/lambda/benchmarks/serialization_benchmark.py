@@ -0,0 +1,91 @@
+"""
+Compare the old per-handler Decimal handling with common/serialization.py.
+
+Runs against synthetic catalog items shaped like boto3 resource output
+(every number a Decimal). Usage:
+
+    python tests/lambda/benchmarks/serialization_benchmark.py [num_movies]
+"""
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                                'src', 'backend', 'infrastructure', 'lambda', 'functions'))
+from common.serialization import dumps, to_native  # noqa: E402
+
+def make_movie(i):
+    return {
+        'movie_id': str(1000 + i),
+        'title': f'Movie {i}',
+        'year': Decimal(1980 + i % 45),
+        'genres': ['Action', 'Drama', 'Science Fiction'][:1 + i % 3],
+        'image_url': f'https://image.tmdb.org/t/p/w500/{i}.jpg',
+        'summary': 'A long enough plot summary to look like the real thing. ' * 6,
+        'content_rating': 'PG-13',
+        'ratings': [
+            {'source': 'TMDB', 'score': Decimal('7.3'), 'max_score': Decimal('10.0')},
+            {'source': 'IMDB', 'score': Decimal('7.9'), 'max_score': Decimal('10.0')},
+            {'source': 'Rotten Tomatoes', 'score': Decimal('88.0'), 'max_score': Decimal('100.0')}
+        ],
+        'streaming_platforms': [{'platform': 'Netflix', 'url': 'https://www.netflix.com'}],
+        'last_updated': '2024-01-01T00:00:00'
+    }
+
+# The approach the selection handlers used before common/serialization.py
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError
+
+def convert_decimals(obj, to_float=True):
+    if isinstance(obj, dict):
+        return {k: convert_decimals(v, to_float) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_decimals(x, to_float) for x in obj]
+    elif isinstance(obj, Decimal):
+        return float(obj) if to_float else obj
+    elif isinstance(obj, float):
+        return obj if to_float else Decimal(str(obj))
+    return obj
+
+def legacy_response(movies):
+    # suite3: default=str round trip of the candidates, then suite2/suite3's
+    # float conversion, round trip, Decimal conversion for the party write
+    # and finally the response body
+    movies = json.loads(json.dumps(movies, default=str))
+    movies = convert_decimals(movies, to_float=True)
+    movies = json.loads(json.dumps(movies))
+    stored = convert_decimals(movies, to_float=False)
+    return stored, json.dumps({'movies': movies}, default=decimal_default)
+
+def new_response(movies):
+    return movies, dumps({'movies': movies})
+
+def bench(label, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f'{label:<40} {seconds * 1000:8.3f} ms')
+    return seconds
+
+def main():
+    num_movies = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    movies = [make_movie(i) for i in range(num_movies)]
+    number = max(1, 20000 // num_movies)
+    print(f'{num_movies} movies, best of 5 x {number} runs\n')
+
+    old = bench('legacy response pipeline', lambda: legacy_response(movies), number)
+    new = bench('serialization.dumps', lambda: new_response(movies), number)
+    print(f'{"speedup":<40} {old / new:8.1f}x\n')
+
+    bench('json.dumps(default=decimal_default)', lambda: json.dumps(movies, default=decimal_default), number)
+    bench('serialization.dumps', lambda: dumps(movies), number)
+    bench('convert_decimals', lambda: convert_decimals(movies), number)
+    bench('serialization.to_native', lambda: to_native(movies), number)
+
+    old_body, new_body = legacy_response(movies)[1], new_response(movies)[1]
+    print(f'\nbody size: legacy {len(old_body)} bytes, new {len(new_body)} bytes')
+
+if __name__ == '__main__':
+    main()
@@ -43,18 +43,14 @@ echo "Suite 2 Response:"
 echo "${MOVIES_RESPONSE}" | jq '.'
 
 echo "5. Submitting Suite 2 ratings..."
-echo "${MOVIES_RESPONSE}" | jq '.movies[]' | jq -c '.' | while read -r MOVIE; do
-  MOVIE_ID=$(echo $MOVIE | jq -r '.movie_id')
-  echo "Rating movie: $MOVIE_ID"
-  RATING_RESPONSE=$(curl -s -X PUT "${API_ENDPOINT}/party/${PARTY_ID}/rate/${MOVIE_ID}" \
-    -H "Content-Type: application/json" \
-    -d "{
-      \"user_id\": \"${USER_ID}\",
-      \"rating\": 8
-    }")
-  echo "Rating response: $RATING_RESPONSE"
-  sleep 1
-done
+RATINGS=$(echo "${MOVIES_RESPONSE}" | jq -c '[.movies[] | {movie_id: .movie_id, rating: 8}]')
+RATING_RESPONSE=$(curl -s -X PUT "${API_ENDPOINT}/party/${PARTY_ID}/rate" \
+  -H "Content-Type: application/json" \
+  -d "{
+    \"user_id\": \"${USER_ID}\",
+    \"ratings\": ${RATINGS}
+  }")
+echo "Rating response: $RATING_RESPONSE"
 
 echo "6. Getting Suite 3 movies..."
 SUITE3_RESPONSE=$(curl -s -X GET "${API_ENDPOINT}/party/${PARTY_ID}/suite3movies")